@@ -0,0 +1,169 @@
+"""
+Low-stock alert engine.
+
+Every flush that changes a product's quantity or threshold is checked for a
+threshold crossing. A `low` alert is emitted when quantity drops below
+`low_stock_threshold`, and nothing more until it recovers to at least
+threshold + hysteresis, which emits `recovered`. Small movements around
+the threshold therefore do not produce a stream of alerts.
+
+This covers every ORM write path (transactions, product edits, imports).
+Bulk UPDATE statements bypass the ORM and must call `record_bulk_crossings`.
+
+Alerts are stored in `stock_alerts`, which subscribers read as a
+Server-Sent Events stream (`/api/alerts/stream`) or, when ALERT_WEBHOOK_URL
+is set, receive as webhook posts sent by the job worker. Readers resume by
+`sequence`, which numbers alerts in commit order. Serial IDs are assigned
+at flush time, so a reader following IDs could skip an alert whose
+transaction committed after a later one.
+"""
+import math
+import threading
+import urllib.request
+from datetime import datetime
+from flask import current_app, has_app_context
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.orm import Session
+from backend.app import db
+from backend.broadcast import allocate_sequence
+from backend.models import Product, StockAlert
+from backend.representations import dumps
+
+# Wakes SSE streams in this process as soon as an alert is committed
+alert_condition = threading.Condition()
+
+# `stream_sequences` counter that numbers alerts
+ALERT_SEQUENCE = 'stock_alerts'
+
+
+def hysteresis_margin(threshold):
+    ratio = current_app.config['ALERT_HYSTERESIS_RATIO'] if has_app_context() else 0.2
+    return max(1, math.ceil(threshold * ratio))
+
+
+def crossing(quantity, threshold, alerted):
+    """Return the alert kind if the product crossed its threshold, else None"""
+    if not alerted and quantity < threshold:
+        return 'low'
+    if alerted and quantity >= threshold + hysteresis_margin(threshold):
+        return 'recovered'
+    return None
+
+
+def check_threshold(product):
+    """Update the product's alert state, returns a new StockAlert on a crossing"""
+    threshold = product.low_stock_threshold or 0
+    quantity = product.quantity or 0
+
+    kind = crossing(quantity, threshold, product.low_stock_alerted)
+    if kind is None:
+        return None
+
+    product.low_stock_alerted = kind == 'low'
+    return StockAlert(product=product, kind=kind, quantity=quantity, threshold=threshold)
+
+
+def record_bulk_crossings(rows):
+    """Alert check for bulk writes that bypass the ORM.
+
+    `rows` are (product_id, quantity, threshold, alerted) tuples reflecting
+    the new values. Emits alerts and updates alert state in the current
+    transaction, returns the number of alerts.
+    """
+    alerts = []
+    states = []
+    for product_id, quantity, threshold, alerted in rows:
+        kind = crossing(quantity or 0, threshold or 0, alerted)
+        if kind is not None:
+            alerts.append({'product_id': product_id, 'kind': kind, 'quantity': quantity or 0,
+                           'threshold': threshold or 0, 'created_at': datetime.utcnow()})
+            states.append({'id': product_id, 'low_stock_alerted': kind == 'low'})
+
+    if alerts:
+        db.session.execute(insert(StockAlert), alerts)
+        db.session.execute(update(Product), states)
+        db.session.info['stock_alerts_emitted'] = True
+    return len(alerts)
+
+
+@event.listens_for(Session, 'before_flush')
+def detect_crossings(session, flush_context, instances):
+    emitted = False
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Product):
+            continue
+        state = inspect(obj)
+        if not state.pending and not (state.attrs.quantity.history.has_changes()
+                                      or state.attrs.low_stock_threshold.history.has_changes()):
+            continue
+        alert = check_threshold(obj)
+        if alert is not None:
+            session.add(alert)
+            emitted = True
+    if emitted:
+        session.info['stock_alerts_emitted'] = True
+
+
+@event.listens_for(Session, 'before_commit')
+def number_alerts(session):
+    # Commit flushes after this hook runs, flush now so the last alerts are numbered
+    session.flush()
+    if not session.info.get('stock_alerts_emitted'):
+        return
+    # Only this transaction's alerts are unnumbered, committed ones always have a sequence
+    ids = session.execute(
+        select(StockAlert.id).where(StockAlert.sequence.is_(None)).order_by(StockAlert.id)
+    ).scalars().all()
+    if ids:
+        base = allocate_sequence(session, ALERT_SEQUENCE, len(ids))
+        session.execute(update(StockAlert), [
+            {'id': alert_id, 'sequence': base + offset} for offset, alert_id in enumerate(ids)
+        ])
+
+
+@event.listens_for(Session, 'after_commit')
+def notify_subscribers(session):
+    if session.info.pop('stock_alerts_emitted', False):
+        with alert_condition:
+            alert_condition.notify_all()
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_pending(session):
+    session.info.pop('stock_alerts_emitted', None)
+
+
+def wait_for_alerts(timeout):
+    """Block until an alert is committed in this process or the timeout passes"""
+    with alert_condition:
+        alert_condition.wait(timeout)
+
+
+def alerts_after(sequence, limit=100):
+    """Committed alerts after `sequence`, in commit order"""
+    return (StockAlert.query.filter(StockAlert.sequence > sequence)
+            .order_by(StockAlert.sequence).limit(limit).all())
+
+
+def deliver_pending_alerts(url, batch_size=100, timeout=5):
+    """POST undelivered alerts to the webhook and mark them delivered, returns the count sent"""
+    alerts = (StockAlert.query.filter(StockAlert.delivered_at.is_(None))
+              .order_by(StockAlert.id).limit(batch_size).all())
+    if not alerts:
+        return 0
+
+    request = urllib.request.Request(
+        url,
+        data=dumps([alert.to_dict() for alert in alerts]),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    # Raises on non-2xx responses, alerts stay in the outbox for the next attempt
+    with urllib.request.urlopen(request, timeout=timeout):
+        pass
+
+    now = datetime.utcnow()
+    for alert in alerts:
+        alert.delivered_at = now
+    db.session.commit()
+    return len(alerts)
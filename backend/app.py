@@ -1,10 +1,13 @@
 from flask import Flask
 from flask_restx import Api
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from flask_migrate import Migrate, upgrade
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from datetime import timedelta
+import click
+from flask.cli import with_appcontext
 import os
 
 # Initialize extensions
@@ -22,23 +25,68 @@ def create_app():
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
     app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=30)
+    app.config['JSON_STREAM_THRESHOLD'] = int(os.getenv('JSON_STREAM_THRESHOLD', 1000))
+    app.config['JSON_STREAM_CHUNK_SIZE'] = int(os.getenv('JSON_STREAM_CHUNK_SIZE', 500))
+    app.config['JOBS_RESULT_DIR'] = os.getenv('JOBS_RESULT_DIR', os.path.join(app.instance_path, 'job-results'))
+    app.config['JOB_WORKER_PROCESSES'] = int(os.getenv('JOB_WORKER_PROCESSES', 2))
+    app.config['JOB_POLL_INTERVAL'] = float(os.getenv('JOB_POLL_INTERVAL', 1.0))
+    app.config['JOB_STALE_AFTER'] = int(os.getenv('JOB_STALE_AFTER', 3600))
+    app.config['ALERT_HYSTERESIS_RATIO'] = float(os.getenv('ALERT_HYSTERESIS_RATIO', 0.2))
+    app.config['ALERT_WEBHOOK_URL'] = os.getenv('ALERT_WEBHOOK_URL')
+    app.config['ALERT_STREAM_POLL_INTERVAL'] = float(os.getenv('ALERT_STREAM_POLL_INTERVAL', 2.0))
+    app.config['STREAM_KEEPALIVE'] = float(os.getenv('STREAM_KEEPALIVE', 15.0))
+    # memory, postgresql; PostgreSQL databases default to NOTIFY so writes from the job worker reach API streams
+    app.config['STREAM_BACKEND'] = os.getenv('STREAM_BACKEND') or (
+        'postgresql' if app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgresql') else 'memory')
+    app.config['STREAM_CHANNEL'] = os.getenv('STREAM_CHANNEL', 'stock_events')
+    app.config['STREAM_BUFFER_SIZE'] = int(os.getenv('STREAM_BUFFER_SIZE', 1000))
+    app.config['STREAM_QUEUE_SIZE'] = int(os.getenv('STREAM_QUEUE_SIZE', 1000))
+    app.config['STREAM_MAX_CONNECTIONS'] = int(os.getenv('STREAM_MAX_CONNECTIONS', 4))  # per worker process
+    app.config['RATELIMIT_ENABLED'] = os.getenv('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    app.config['RATELIMIT_STORAGE'] = os.getenv('RATELIMIT_STORAGE', 'memory')  # memory, database
+    app.config['RATELIMIT_RATE'] = float(os.getenv('RATELIMIT_RATE', 10))  # tokens per second
+    app.config['RATELIMIT_BURST'] = int(os.getenv('RATELIMIT_BURST', 50))
+    # Reverse proxies in front of the app whose X-Forwarded-* headers are trusted, 0 when exposed directly
+    app.config['TRUSTED_PROXY_HOPS'] = int(os.getenv('TRUSTED_PROXY_HOPS', 0))
+    app.config['API_DOCS_ENABLED'] = os.getenv('API_DOCS_ENABLED', 'true').lower() == 'true'
+    
+    # Client addresses (used to rate limit anonymous requests) come from the proxy headers
+    hops = app.config['TRUSTED_PROXY_HOPS']
+    if hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
     
     # Initialize extensions with app
     db.init_app(app)
-    migrate.init_app(app, db)
+    migrate.init_app(app, db, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'))
     jwt.init_app(app)
     CORS(app, resources={r"/api/*": {"origins": "*"}})
     
-    # Initialize API with Swagger documentation
+    # Fan-out for the live stock stream
+    from backend.broadcast import init_broadcaster
+    init_broadcaster(app)
+    
+    # Per-user token bucket rate limiting and the cap on open streams
+    from backend.throttle import init_rate_limiter, init_stream_slots
+    init_rate_limiter(app)
+    init_stream_slots(app)
+    
+    # Initialize API with Swagger documentation. The spec is only built on the
+    # first request to /api/swagger.json; production can turn docs off entirely.
+    docs_enabled = app.config['API_DOCS_ENABLED']
     api = Api(
         app,
         version='1.0',
         title='Inventory Management API',
         description='A comprehensive REST API for managing inventory, products, categories, suppliers, and transactions',
-        doc='/api/docs',
+        doc='/api/docs' if docs_enabled else False,
+        add_specs=docs_enabled,
         prefix='/api'
     )
     
+    # Use the fast JSON encoder for all API responses
+    from backend.representations import output_json
+    api.representations['application/json'] = output_json
+    
     # Register namespaces
     from backend.routes.auth import auth_ns
     from backend.routes.products import products_ns
@@ -46,6 +94,11 @@ def create_app():
     from backend.routes.suppliers import suppliers_ns
     from backend.routes.transactions import transactions_ns
     from backend.routes.users import users_ns
+    from backend.routes.jobs import jobs_ns
+    from backend.routes.alerts import alerts_ns
+    from backend.routes.stream import stream_ns
+    from backend.routes.forecast import forecast_ns
+    from backend.routes.locations import locations_ns
     
     api.add_namespace(auth_ns, path='/auth')
     api.add_namespace(products_ns, path='/products')
@@ -53,13 +106,30 @@ def create_app():
     api.add_namespace(suppliers_ns, path='/suppliers')
     api.add_namespace(transactions_ns, path='/transactions')
     api.add_namespace(users_ns, path='/users')
+    api.add_namespace(jobs_ns, path='/jobs')
+    api.add_namespace(alerts_ns, path='/alerts')
+    api.add_namespace(stream_ns, path='/stream')
+    api.add_namespace(forecast_ns, path='/forecast')
+    api.add_namespace(locations_ns, path='/locations')
     
-    # Create tables
-    with app.app_context():
-        db.create_all()
+    # Register CLI commands
+    from backend.ledger import ledger_cli
+    app.cli.add_command(ledger_cli)
+    app.cli.add_command(init_db_command)
     
     return app
 
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create or upgrade the database schema."""
+    # Run once per deployment instead of on every worker boot. Same as
+    # `flask db upgrade`; also upgrades databases built with create_all().
+    upgrade()
+    click.echo('Database schema is up to date.')
+
 if __name__ == '__main__':
     app = create_app()
+    with app.app_context():
+        upgrade()
     app.run(debug=True, host='0.0.0.0', port=5000)
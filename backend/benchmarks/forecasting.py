@@ -0,0 +1,89 @@
+"""
+Benchmark catalog-wide demand forecasting.
+
+Compares a per-product Python loop over dense daily series (what a naive
+implementation would do) against the vectorized forecast used by
+/api/forecast/reorder-points, on synthetic sparse demand. That both give
+the same reorder points is checked in backend/tests/test_forecasting.py.
+Run from the repository root:
+
+    python -m backend.benchmarks.forecasting --products 500000 --window 90
+"""
+import argparse
+import math
+import time
+from statistics import NormalDist
+
+import numpy as np
+
+from backend.forecasting import DEFAULTS, forecast_demand
+
+
+def make_demand(products, window, density, seed=0):
+    """Sparse (product index, day index, quantity) observations, one per product day like the ledger query"""
+    rng = np.random.default_rng(seed)
+    count = int(products * window * density)
+    cells = np.unique(rng.integers(0, products * window, count))
+    quantity = rng.integers(1, 20, len(cells))
+    return cells // window, cells % window, quantity
+
+
+def python_loop(products, product_index, day_index, quantity, params):
+    window = params['window_days']
+    alpha = params['alpha']
+    lead_time = params['lead_time_days']
+    z = NormalDist().inv_cdf(params['service_level'])
+    series = [[0] * window for _ in range(products)]
+    for product, day, amount in zip(product_index.tolist(), day_index.tolist(), quantity.tolist()):
+        series[product][day] += amount
+
+    reorder_points = []
+    for values in series:
+        mean = sum(values) / window
+        std = math.sqrt(max(sum(v * v for v in values) / window - mean * mean, 0.0))
+        smoothed = 0.0
+        for value in values:
+            smoothed = alpha * value + (1 - alpha) * smoothed
+        forecast = smoothed / (1 - (1 - alpha) ** window)
+        reorder_points.append(math.ceil(forecast * lead_time + z * std * math.sqrt(lead_time) - 1e-9))
+    return reorder_points
+
+
+def vectorized(products, product_index, day_index, quantity, params):
+    return forecast_demand(products, product_index, day_index, quantity, **params)['reorder_point']
+
+
+def measure(name, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    print(f'{name:<24} {elapsed * 1000:>10.1f} ms')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=500000)
+    parser.add_argument('--window', type=int, default=90)
+    parser.add_argument('--density', type=float, default=0.05, help='Fraction of product days with sales')
+    parser.add_argument('--loop-products', type=int, default=50000,
+                        help='Products for the Python loop, which is extrapolated to --products')
+    args = parser.parse_args()
+
+    params = dict(DEFAULTS, window_days=args.window, ma_days=min(DEFAULTS['ma_days'], args.window))
+    demand = make_demand(args.products, args.window, args.density)
+    print(f'Products: {args.products}, window: {args.window} days, observations: {len(demand[0])}')
+
+    measure('vectorized', vectorized, args.products, *demand, params)
+
+    subset = min(args.loop_products, args.products)
+    mask = demand[0] < subset
+    start = time.perf_counter()
+    python_loop(subset, demand[0][mask], demand[1][mask], demand[2][mask], params)
+    elapsed = time.perf_counter() - start
+    print(f'{"python loop":<24} {elapsed * args.products / subset * 1000:>10.1f} ms'
+          f' (extrapolated from {subset} products)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark JSON encoding of large transaction listings.
+
+Compares the stdlib encoder (the Flask-RESTX default) against the API's
+response encoder, both as a single string and streamed in chunks.
+Run from the repository root:
+
+    python -m backend.benchmarks.json_encoding --rows 100000
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from backend.representations import dumps, iter_json_list, orjson
+
+
+def make_rows(count):
+    """Build rows shaped like Transaction.to_dict() output"""
+    now = datetime.utcnow()
+    category = {'id': 1, 'name': 'Electronics', 'description': 'Electronic devices and accessories',
+                'product_count': 12, 'created_at': now}
+    supplier = {'id': 1, 'name': 'Tech Supplies Inc', 'contact_info': '123 Tech Street, Silicon Valley',
+                'phone': '+1-555-0101', 'email': 'contact@techsupplies.com', 'product_count': 12,
+                'created_at': now}
+    user = {'id': 1, 'username': 'admin', 'email': 'admin@inventory.com', 'role': 'admin', 'created_at': now}
+    rows = []
+    for i in range(count):
+        product = {'id': i % 500, 'name': f'Product {i % 500}', 'sku': f'SKU-{i % 500:05d}',
+                   'quantity': i % 97, 'price': 9.99, 'low_stock_threshold': 10,
+                   'is_low_stock': i % 97 < 10, 'category': category, 'supplier': supplier,
+                   'created_at': now, 'updated_at': now}
+        rows.append({'id': i, 'product': product, 'user': user, 'action_type': 'remove',
+                     'quantity': 1, 'notes': '', 'timestamp': now - timedelta(minutes=i)})
+    return rows
+
+
+def isoformat_rows(rows):
+    """Pre-format datetimes the way to_dict() used to"""
+    def convert(value):
+        if isinstance(value, dict):
+            return {k: convert(v) for k, v in value.items()}
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
+    return [convert(row) for row in rows]
+
+
+def stdlib_baseline(rows):
+    return len(json.dumps(isoformat_rows(rows)) + '\n')
+
+
+def encode_whole(rows):
+    return len(dumps(rows))
+
+
+def encode_streamed(rows):
+    return sum(len(chunk) for chunk in iter_json_list(rows))
+
+
+def measure(name, func, rows):
+    # Time and memory are measured in separate runs, tracemalloc skews timings
+    start = time.perf_counter()
+    size = func(rows)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{name:<28} {elapsed * 1000:>10.1f} ms {peak / 1024 / 1024:>10.1f} MiB {size / 1024 / 1024:>10.1f} MiB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f'Encoder: {"orjson" if orjson is not None else "stdlib json"}, rows: {args.rows}')
+    rows = make_rows(args.rows)
+
+    print(f'{"":<28} {"time":>13} {"peak mem":>14} {"body":>14}')
+    measure('stdlib json (default)', stdlib_baseline, rows)
+    measure('api encoder, single body', encode_whole, rows)
+    measure('api encoder, streamed', encode_streamed, rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark worker startup: cold boot to first response.
+
+Each sample runs in a fresh interpreter, like a new gunicorn worker or
+container, and reports the time to import and build the app and the
+latency of the first request, an authenticated GET that queries the
+database. The schema is migrated and a benchmark user is created first.
+The `legacy boot` variant adds the db.create_all() call that create_app()
+used to make on every boot.
+Run from the repository root:
+
+    python -m backend.benchmarks.startup --samples 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SAMPLE = r'''
+import json, os, sys, time
+start = time.perf_counter()
+from backend.app import create_app, db
+app = create_app()
+if os.environ['BENCH_CREATE_ALL'] == '1':
+    with app.app_context():
+        db.create_all()
+ready = time.perf_counter()
+response = app.test_client().get(os.environ['BENCH_PATH'],
+                                  headers={'Authorization': 'Bearer ' + os.environ['BENCH_TOKEN']})
+first = time.perf_counter()
+print(json.dumps({'boot': ready - start, 'first_request': first - ready, 'status': response.status_code}))
+'''
+
+VARIANTS = [
+    ('legacy boot (create_all)', {'BENCH_CREATE_ALL': '1', 'API_DOCS_ENABLED': 'true'}),
+    ('lazy boot, docs enabled', {'BENCH_CREATE_ALL': '0', 'API_DOCS_ENABLED': 'true'}),
+    ('lazy boot, docs disabled', {'BENCH_CREATE_ALL': '0', 'API_DOCS_ENABLED': 'false'}),
+]
+
+
+def prepare(env):
+    """Migrate the benchmark database and return an access token for the first request"""
+    os.environ.update(env)
+    from flask_jwt_extended import create_access_token
+    from flask_migrate import upgrade
+    from backend.app import create_app, db
+    from backend.models import User
+
+    app = create_app()
+    with app.app_context():
+        upgrade()
+        user = User.query.filter_by(username='benchmark').first()
+        if user is None:
+            user = User(username='benchmark', email='benchmark@inventory.com', role='viewer')
+            user.set_password(os.urandom(16).hex())
+            db.session.add(user)
+            db.session.commit()
+        return create_access_token(identity=user.id)
+
+
+def run_sample(env):
+    output = subprocess.run([sys.executable, '-c', SAMPLE], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    sample = json.loads(output.strip().splitlines()[-1])
+    if sample['status'] != 200:
+        raise SystemExit(f'First request returned {sample["status"]}, expected 200')
+    return sample
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--samples', type=int, default=5)
+    parser.add_argument('--path', default='/api/categories/', help='Path of the first request')
+    args = parser.parse_args()
+
+    base = dict(os.environ, BENCH_PATH=args.path)
+    base.setdefault('DATABASE_URL', 'sqlite:///startup-benchmark.db')
+    base['BENCH_TOKEN'] = prepare(base)
+
+    print(f'First request: authenticated GET {args.path}, {args.samples} cold starts per variant')
+    print(f'{"":<28} {"boot":>12} {"first request":>16} {"total":>12}')
+    for name, overrides in VARIANTS:
+        samples = [run_sample(dict(base, **overrides)) for _ in range(args.samples)]
+        boot = statistics.median(sample['boot'] for sample in samples) * 1000
+        first = statistics.median(sample['first_request'] for sample in samples) * 1000
+        print(f'{name:<28} {boot:>9.1f} ms {first:>13.1f} ms {boot + first:>9.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+"""
+Stock change broadcasting for the live stock stream (/api/stream/stock).
+
+Committed changes to product quantities (`quantity` events) and to
+per-location stock (`location` events) are turned into events and fanned
+out to subscribers. Event IDs increase in commit order, and the most
+recent events are kept in a ring buffer, so clients can resume with
+Last-Event-ID without missing anything committed after it.
+
+Backends (STREAM_BACKEND):
+  memory      events only reach subscribers in the same process and are
+              numbered as they are delivered
+  postgresql  events are numbered from a counter row in `stream_sequences`,
+              whose lock is held until commit, and sent with NOTIFY as part
+              of the committing transaction. Every gunicorn worker LISTENs,
+              so all subscribers see all events, in ID order.
+"""
+import json
+import queue
+import select
+import threading
+import time
+from collections import deque
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+from backend.models import Product, StockLevel, StreamSequence
+
+
+def allocate_sequence(session, channel, count):
+    """Reserve `count` consecutive numbers from the `channel` counter, returns the first.
+
+    The counter row stays locked until this transaction commits, so numbers
+    are handed out in commit order.
+    """
+    table = StreamSequence.__table__
+    statement = table.update().where(table.c.channel == channel).values(
+        last_id=table.c.last_id + count
+    ).returning(table.c.last_id)
+    last_id = session.execute(statement).scalar()
+    if last_id is None:
+        session.execute(text(
+            'INSERT INTO stream_sequences (channel, last_id) VALUES (:channel, 0) ON CONFLICT DO NOTHING'
+        ), {'channel': channel})
+        last_id = session.execute(statement).scalar()
+    return last_id - count + 1
+
+
+class Subscription:
+    def __init__(self, broadcaster, maxsize):
+        self.broadcaster = broadcaster
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def get(self, timeout):
+        """Next event, or None if nothing arrived within the timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+
+class Broadcaster:
+    """In-process fan-out with a replay buffer"""
+
+    def __init__(self, buffer_size=1000, queue_size=1000):
+        self.buffer = deque(maxlen=buffer_size)
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        # IDs continue from a timestamp so they stay unique across restarts
+        self.last_id = time.time_ns() // 1000
+        # Events with IDs up to `floor` may be missing from the buffer
+        self.floor = self.last_id
+
+    def subscribe(self):
+        subscription = Subscription(self, self.queue_size)
+        with self.lock:
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+    def replay(self, last_id):
+        """Buffered events after `last_id`, or None if some may have been missed"""
+        with self.lock:
+            if not self.floor <= last_id <= self.last_id:
+                return None
+            return [item for item in self.buffer if item['id'] > last_id]
+
+    def deliver(self, events):
+        with self.lock:
+            for item in events:
+                if 'id' not in item:
+                    item['id'] = self.last_id + 1
+                if len(self.buffer) == self.buffer.maxlen:
+                    self.floor = self.buffer[0]['id']
+                self.buffer.append(item)
+                self.last_id = max(self.last_id, item['id'])
+            # Queued under the lock so every subscriber receives events in ID order
+            for subscription in list(self.subscribers):
+                for item in events:
+                    try:
+                        subscription.queue.put_nowait(item)
+                    except queue.Full:
+                        # Slow client, it resumes from the buffer after reconnecting
+                        subscription.overflowed = True
+                        self.subscribers.discard(subscription)
+                        break
+
+    def before_commit(self, session, events):
+        """Called inside the committing transaction"""
+
+    def after_commit(self, events):
+        self.deliver(events)
+
+
+class PostgresBroadcaster(Broadcaster):
+    """Fans out through PostgreSQL LISTEN/NOTIFY so every worker process sees every event"""
+
+    max_payload = 7900
+
+    def __init__(self, url, channel, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self.channel = channel
+        self.listener = None
+        self.listener_lock = threading.Lock()
+        self.listening = threading.Event()
+        # Nothing can be replayed until the listener knows where the sequence stands
+        self.last_id = self.floor = 0
+
+    def subscribe(self):
+        self.ensure_listener()
+        return super().subscribe()
+
+    def replay(self, last_id):
+        self.listening.wait(5)
+        if not self.listening.is_set():
+            return None
+        return super().replay(last_id)
+
+    def ensure_listener(self):
+        # Started lazily so each forked gunicorn worker runs its own listener thread
+        with self.listener_lock:
+            if self.listener is None or not self.listener.is_alive():
+                self.listener = threading.Thread(target=self.listen, name='stock-stream-listener', daemon=True)
+                self.listener.start()
+
+    def listen(self):
+        import psycopg2
+        import psycopg2.extensions
+
+        reconnecting = False
+        while True:
+            try:
+                connection = psycopg2.connect(self.url)
+                connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.channel}')
+                    cursor.execute('SELECT last_id FROM stream_sequences WHERE channel = %s', (self.channel,))
+                    row = cursor.fetchone()
+                # Events committed while not listening were missed, only later ones can be replayed
+                with self.lock:
+                    self.floor = max(self.floor, row[0] if row else 0)
+                    self.last_id = max(self.last_id, self.floor)
+                    if reconnecting:
+                        # Open streams may have missed events too, end them so clients resume and reset
+                        for subscription in self.subscribers:
+                            subscription.overflowed = True
+                        self.subscribers.clear()
+                self.listening.set()
+                while True:
+                    if select.select([connection], [], [], 30) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        notify = connection.notifies.pop(0)
+                        self.deliver(json.loads(notify.payload))
+            except Exception:
+                # Reconnect after database restarts or network errors
+                self.listening.clear()
+                reconnecting = True
+                time.sleep(1)
+
+    def before_commit(self, session, events):
+        base = allocate_sequence(session, self.channel, len(events))
+        for offset, item in enumerate(events):
+            item['id'] = base + offset
+
+        # NOTIFY is transactional: listeners only hear about committed changes.
+        # Payloads are limited to 8000 bytes, so large commits are split.
+        batch, size = [], 2
+        for item in events:
+            length = len(json.dumps(item)) + 1
+            if batch and size + length > self.max_payload:
+                self.notify(session, batch)
+                batch, size = [], 2
+            batch.append(item)
+            size += length
+        if batch:
+            self.notify(session, batch)
+
+    def notify(self, session, events):
+        session.execute(text('SELECT pg_notify(:channel, :payload)'),
+                        {'channel': self.channel, 'payload': json.dumps(events)})
+
+    def after_commit(self, events):
+        # Delivered to this process by the listener like every other worker
+        pass
+
+
+def init_broadcaster(app):
+    config = app.config
+    options = {'buffer_size': config['STREAM_BUFFER_SIZE'], 'queue_size': config['STREAM_QUEUE_SIZE']}
+    if config['STREAM_BACKEND'] == 'postgresql':
+        from sqlalchemy.engine import make_url
+        url = make_url(config['SQLALCHEMY_DATABASE_URI']).set(drivername='postgresql')
+        broadcaster = PostgresBroadcaster(url.render_as_string(hide_password=False),
+                                          config['STREAM_CHANNEL'], **options)
+    else:
+        broadcaster = Broadcaster(**options)
+    app.extensions['stock_broadcaster'] = broadcaster
+    return broadcaster
+
+
+def get_broadcaster():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('stock_broadcaster')
+
+
+def product_event(product, delta, deleted=False):
+    return {
+        'type': 'deleted' if deleted else 'quantity',
+        'product_id': product.id,
+        'sku': product.sku,
+        'quantity': product.quantity,
+        'delta': delta,
+        'low_stock_threshold': product.low_stock_threshold,
+        'category_id': product.category_id,
+        'supplier_id': product.supplier_id
+    }
+
+
+def location_event(level, delta):
+    product = level.product
+    return {
+        'type': 'location',
+        'product_id': level.product_id,
+        'sku': product.sku if product else None,
+        'location_id': level.location_id,
+        'quantity': level.quantity,
+        'delta': delta,
+        'category_id': product.category_id if product else None,
+        'supplier_id': product.supplier_id if product else None
+    }
+
+
+@event.listens_for(Session, 'after_flush')
+def collect_stock_events(session, flush_context):
+    # Attribute history is still available here and new products have IDs
+    events = session.info.setdefault('stock_events', [])
+    for obj in session.new:
+        if isinstance(obj, Product):
+            events.append(product_event(obj, obj.quantity or 0))
+        elif isinstance(obj, StockLevel):
+            events.append(location_event(obj, obj.quantity or 0))
+    for obj in session.dirty:
+        if isinstance(obj, (Product, StockLevel)):
+            history = inspect(obj).attrs.quantity.history
+            if history.deleted and history.added:
+                delta = (history.added[0] or 0) - (history.deleted[0] or 0)
+                if isinstance(obj, Product):
+                    events.append(product_event(obj, delta))
+                else:
+                    events.append(location_event(obj, delta))
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            events.append(product_event(obj, -(obj.quantity or 0), deleted=True))
+
+
+@event.listens_for(Session, 'before_commit')
+def stamp_stock_events(session):
+    broadcaster = get_broadcaster()
+    if broadcaster is None:
+        return
+    # Commit flushes after this hook runs, flush now so the last changes are collected
+    session.flush()
+    events = session.info.get('stock_events')
+    if events:
+        broadcaster.before_commit(session, events)
+
+
+@event.listens_for(Session, 'after_commit')
+def publish_stock_events(session):
+    events = session.info.pop('stock_events', None)
+    broadcaster = get_broadcaster()
+    if events and broadcaster is not None:
+        broadcaster.after_commit(events)
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_stock_events(session):
+    session.info.pop('stock_events', None)
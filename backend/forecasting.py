@@ -0,0 +1,225 @@
+"""
+Demand forecasting and reorder point suggestions.
+
+Daily `remove` volumes are read from the ledger in one grouped query and
+every statistic is computed for the whole catalog at once with NumPy.
+Nothing loops over products in Python and no dense products x days matrix
+is built, so a full recompute over hundreds of thousands of products takes
+seconds.
+
+For each product, over the last `window_days`:
+  demand_rate   mean daily demand
+  demand_std    standard deviation of daily demand (days without sales count as 0)
+  forecast      expected daily demand: exponential smoothing (`ewma`),
+                trailing moving average (`moving_average`) or `mean`
+  safety_stock  z(service_level) * demand_std * sqrt(lead_time_days)
+  reorder_point forecast * lead_time_days + safety_stock, rounded up
+"""
+import math
+from datetime import datetime, timedelta
+from statistics import NormalDist
+import numpy as np
+from sqlalchemy import func, select, update
+from backend.app import db
+from backend.models import Product, Transaction
+from backend.alerts import record_bulk_crossings
+from backend.jobs import job_handler, report_progress
+
+METHODS = ('ewma', 'moving_average', 'mean')
+
+DEFAULTS = {
+    'window_days': 90,
+    'lead_time_days': 7.0,
+    'service_level': 0.95,
+    'method': 'ewma',
+    'alpha': 0.3,
+    'ma_days': 28
+}
+
+# Upper bounds keep reorder points well inside the range of an integer threshold
+MAX_WINDOW_DAYS = 730
+MAX_LEAD_TIME_DAYS = 365
+
+
+def forecast_params(values):
+    """Validate forecast parameters from a request or job, raises ValueError"""
+    params = dict(DEFAULTS)
+    for key, default in DEFAULTS.items():
+        if values.get(key) is not None:
+            params[key] = type(default)(values[key])
+
+    for key, value in params.items():
+        if isinstance(value, float) and not math.isfinite(value):
+            raise ValueError(f'{key} must be a finite number')
+    if not 1 <= params['window_days'] <= MAX_WINDOW_DAYS or not 1 <= params['ma_days'] <= params['window_days']:
+        raise ValueError(f'window_days must be between 1 and {MAX_WINDOW_DAYS} '
+                         'and ma_days between 1 and window_days')
+    if not 0 <= params['lead_time_days'] <= MAX_LEAD_TIME_DAYS:
+        raise ValueError(f'lead_time_days must be between 0 and {MAX_LEAD_TIME_DAYS}')
+    if not 0.5 <= params['service_level'] < 1:
+        raise ValueError('service_level must be between 0.5 and 1')
+    if not 0 < params['alpha'] <= 1:
+        raise ValueError('alpha must be between 0 and 1')
+    if params['method'] not in METHODS:
+        raise ValueError(f"method must be one of: {', '.join(METHODS)}")
+    return params
+
+
+def forecast_demand(n_products, product_index, day_index, quantity, window_days,
+                    lead_time_days, service_level, method, alpha, ma_days):
+    """Vectorized forecast from sparse (product, day, quantity) demand observations.
+
+    `day_index` counts from 0 (oldest day) to window_days - 1 (most recent).
+    Returns a dict of per-product arrays.
+    """
+    quantity = quantity.astype(np.float64)
+    totals = np.bincount(product_index, weights=quantity, minlength=n_products)
+    squares = np.bincount(product_index, weights=quantity ** 2, minlength=n_products)
+
+    demand_rate = totals / window_days
+    demand_std = np.sqrt(np.maximum(squares / window_days - demand_rate ** 2, 0.0))
+
+    if method == 'ewma':
+        # s_T = sum(alpha * (1 - alpha)^(T-1-t) * x_t), bias corrected for the zero start
+        weights = alpha * (1 - alpha) ** (window_days - 1 - day_index)
+        smoothed = np.bincount(product_index, weights=quantity * weights, minlength=n_products)
+        forecast = smoothed / (1 - (1 - alpha) ** window_days)
+    elif method == 'moving_average':
+        recent = day_index >= window_days - ma_days
+        forecast = np.bincount(product_index[recent], weights=quantity[recent], minlength=n_products) / ma_days
+    else:
+        forecast = demand_rate
+
+    z = NormalDist().inv_cdf(service_level)
+    safety_stock = z * demand_std * np.sqrt(lead_time_days)
+    reorder_point = np.ceil(forecast * lead_time_days + safety_stock - 1e-9).astype(np.int64)
+
+    return {
+        'demand_rate': demand_rate,
+        'demand_std': demand_std,
+        'forecast': forecast,
+        'safety_stock': safety_stock,
+        'reorder_point': reorder_point,
+        'has_demand': totals > 0
+    }
+
+
+def load_catalog():
+    rows = db.session.execute(
+        select(Product.id, Product.sku, Product.quantity, Product.low_stock_threshold)
+        .order_by(Product.id)
+    ).all()
+    ids, skus, quantities, thresholds = zip(*rows) if rows else ((), (), (), ())
+    return {
+        'product_id': np.array(ids, dtype=np.int64),
+        'sku': list(skus),
+        'quantity': np.array([q or 0 for q in quantities], dtype=np.int64),
+        'low_stock_threshold': np.array([t or 0 for t in thresholds], dtype=np.int64)
+    }
+
+
+def load_daily_demand(product_ids, start, window_days):
+    """Daily remove volumes as sparse (product index, day index, quantity) arrays"""
+    day = func.date(Transaction.timestamp)
+    rows = db.session.execute(
+        select(Transaction.product_id, day, func.sum(Transaction.quantity))
+        .where(Transaction.action_type == 'remove', Transaction.timestamp >= start)
+        .group_by(Transaction.product_id, day)
+    ).all()
+    if not rows:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty
+
+    ids, days, quantities = zip(*rows)
+    ids = np.array(ids, dtype=np.int64)
+    # SQLite returns ISO strings and PostgreSQL dates, datetime64 parses both
+    days = np.array([str(value) for value in days], dtype='datetime64[D]')
+    day_index = (days - np.datetime64(start.date(), 'D')).astype(np.int64)
+    quantities = np.array(quantities, dtype=np.int64)
+
+    product_index = np.searchsorted(product_ids, ids)
+    # Drop demand for deleted products and anything outside the window
+    known = (product_index < len(product_ids)) & (product_ids[np.minimum(product_index, len(product_ids) - 1)] == ids)
+    known &= (day_index >= 0) & (day_index < window_days)
+    return product_index[known], day_index[known], quantities[known]
+
+
+def compute_reorder_points(params, end=None):
+    """Forecast the whole catalog, returns the catalog and forecast arrays"""
+    end = end or datetime.utcnow()
+    window_days = params['window_days']
+    start = datetime(end.year, end.month, end.day) - timedelta(days=window_days - 1)
+
+    catalog = load_catalog()
+    product_index, day_index, quantity = load_daily_demand(catalog['product_id'], start, window_days)
+    result = forecast_demand(len(catalog['product_id']), product_index, day_index, quantity, **params)
+    return catalog, result
+
+
+def suggestions(catalog, result):
+    """Per-product suggestion dicts for the API"""
+    columns = (
+        catalog['product_id'].tolist(),
+        catalog['sku'],
+        catalog['quantity'].tolist(),
+        catalog['low_stock_threshold'].tolist(),
+        np.round(result['demand_rate'], 4).tolist(),
+        np.round(result['demand_std'], 4).tolist(),
+        np.round(result['forecast'], 4).tolist(),
+        np.round(result['safety_stock'], 2).tolist(),
+        result['reorder_point'].tolist()
+    )
+    keys = ('product_id', 'sku', 'quantity', 'low_stock_threshold', 'demand_rate', 'demand_std',
+            'forecast', 'safety_stock', 'suggested_threshold')
+    return [dict(zip(keys, row)) for row in zip(*columns)]
+
+
+def apply_reorder_points(catalog, result, include_without_demand=False, batch_size=5000, progress=None):
+    """Write suggested reorder points to low_stock_threshold, returns the number changed"""
+    candidates = np.ones(len(catalog['product_id']), dtype=bool)
+    if not include_without_demand:
+        candidates &= result['has_demand']
+
+    ids = catalog['product_id'][candidates].tolist()
+    suggested = dict(zip(ids, result['reorder_point'][candidates].tolist()))
+    changed = 0
+
+    for offset in range(0, len(ids), batch_size):
+        # The catalog snapshot is stale by now. Re-read the rows and keep them locked
+        # until commit, so crossings are computed from the values being overwritten.
+        rows = db.session.execute(
+            select(Product.id, Product.quantity, Product.low_stock_threshold, Product.low_stock_alerted)
+            .where(Product.id.in_(ids[offset:offset + batch_size]))
+            .order_by(Product.id)
+            .with_for_update()
+        ).all()
+        updates = [(row.id, row.quantity, suggested[row.id], row.low_stock_alerted)
+                   for row in rows if suggested[row.id] != row.low_stock_threshold]
+
+        if updates:
+            db.session.execute(update(Product), [
+                {'id': product_id, 'low_stock_threshold': threshold}
+                for product_id, _, threshold, _ in updates
+            ])
+            # Bulk updates bypass the ORM alert hook
+            record_bulk_crossings(updates)
+        db.session.commit()
+        changed += len(updates)
+        if progress is not None:
+            progress(min(offset + batch_size, len(ids)) / len(ids))
+
+    return changed
+
+
+@job_handler('apply_reorder_points', admin_only=True)
+def apply_reorder_points_job(job):
+    """Recompute reorder points and write them back as low stock thresholds"""
+    params = forecast_params(job.params)
+    catalog, result = compute_reorder_points(params)
+    changed = apply_reorder_points(
+        catalog, result,
+        include_without_demand=bool(job.params.get('include_without_demand')),
+        progress=lambda fraction: report_progress(job, fraction, 'Updating thresholds')
+    )
+    job.message = f'Updated {changed} thresholds'
+    return None
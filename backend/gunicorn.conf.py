@@ -0,0 +1,26 @@
+"""
+Gunicorn settings for the API.
+
+The app is loaded once in the master (preload_app) and forked into the
+workers, so each worker starts serving immediately instead of importing
+and building the app itself.
+
+Each open Server-Sent Events stream occupies one thread. The API service
+allows STREAM_MAX_CONNECTIONS streams per worker and leaves the other
+threads to regular requests; the compose `stream` service runs the same
+app with many more threads for dashboards that keep streams open.
+"""
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', 4))
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must not be shared across processes
+    from backend.app import db
+    from backend.wsgi import app
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -0,0 +1,252 @@
+"""
+Background jobs for heavy work (imports, exports, reports).
+
+Jobs are rows in the `jobs` table, the database is the only broker.
+Web requests call `submit_job()` and return immediately; `backend/worker.py`
+claims queued jobs and runs them in a process pool. Result artifacts are
+written to JOBS_RESULT_DIR on local disk.
+
+New job kinds are registered with the `job_handler` decorator. A handler
+receives the Job and returns the path of its result file, or None. Kinds
+registered with `admin_only=True` can only be submitted by admins.
+"""
+import csv
+import gzip
+import os
+import socket
+import traceback
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update
+from sqlalchemy.exc import OperationalError
+from backend.app import db
+from backend.models import Job, Product, Transaction
+from backend.representations import dumps
+from backend.stock import allocated_by_product
+
+HANDLERS = {}
+# Kinds only admins may submit through the jobs API
+ADMIN_ONLY_KINDS = set()
+
+
+def job_handler(kind, admin_only=False):
+    """Register a function as the handler for a job kind"""
+    def decorator(func):
+        HANDLERS[kind] = func
+        if admin_only:
+            ADMIN_ONLY_KINDS.add(kind)
+        else:
+            ADMIN_ONLY_KINDS.discard(kind)
+        return func
+    return decorator
+
+
+def submit_job(kind, params, user_id=None):
+    """Queue a job, raises ValueError for unknown kinds"""
+    if kind not in HANDLERS:
+        raise ValueError(f'Unknown job kind: {kind}')
+    job = Job(kind=kind, params=params or {}, user_id=user_id)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_job(worker):
+    """Atomically mark the oldest queued job as running, returns its id or None"""
+    query = Job.query.filter_by(status='queued').order_by(Job.id)
+    # SKIP LOCKED lets several workers poll PostgreSQL without blocking each other
+    job = query.with_for_update(skip_locked=True).first()
+    if job is None:
+        db.session.rollback()
+        return None
+
+    # The status guard keeps the claim atomic on databases without row locks
+    claimed = db.session.execute(
+        update(Job).where(Job.id == job.id, Job.status == 'queued')
+        .values(status='running', worker=worker, started_at=datetime.utcnow(), updated_at=datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    return job.id if claimed else None
+
+
+def heartbeat_jobs(job_ids, worker):
+    """Mark jobs this worker is still running as alive"""
+    if not job_ids:
+        return
+    db.session.execute(
+        update(Job).where(Job.id.in_(job_ids), Job.status == 'running', Job.worker == worker)
+        .values(updated_at=datetime.utcnow())
+    )
+    db.session.commit()
+
+
+def fail_jobs(job_ids, error):
+    """Mark running jobs failed, e.g. when their worker process died"""
+    if not job_ids:
+        return
+    db.session.execute(
+        update(Job).where(Job.id.in_(job_ids), Job.status == 'running')
+        .values(status='failed', error=error, finished_at=datetime.utcnow(), updated_at=datetime.utcnow())
+    )
+    db.session.commit()
+
+
+def requeue_stale_jobs(stale_after):
+    """Requeue running jobs whose worker stopped sending heartbeats"""
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_after)
+    requeued = db.session.execute(
+        update(Job).where(Job.status == 'running', Job.updated_at < cutoff)
+        .values(status='queued', worker=None, message='Requeued after worker timeout')
+    ).rowcount
+    db.session.commit()
+    return requeued
+
+
+def _set_job_fields(job_id, **values):
+    # Use a separate connection so progress is visible while the handler's
+    # own session is still uncommitted
+    values['updated_at'] = datetime.utcnow()
+    with db.engine.begin() as connection:
+        connection.execute(update(Job.__table__).where(Job.__table__.c.id == job_id).values(**values))
+
+
+def report_progress(job, progress, message=None):
+    """Record progress between 0 and 1 for a running job"""
+    try:
+        _set_job_fields(job.id, progress=min(max(progress, 0.0), 1.0), message=message)
+    except OperationalError:
+        # SQLite allows one writer, the handler's open transaction may hold the lock
+        current_app.logger.debug('Skipped progress update for job %s', job.id)
+
+
+def result_path(job, filename):
+    """Path for a job's result artifact inside JOBS_RESULT_DIR"""
+    directory = os.path.join(current_app.config['JOBS_RESULT_DIR'], str(job.id))
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, filename)
+
+
+def run_job(job_id):
+    """Execute a claimed job and record its outcome"""
+    job = Job.query.get(job_id)
+    if job is None:
+        return
+    try:
+        path = HANDLERS[job.kind](job)
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('Job %s (%s) failed', job_id, job.kind)
+        _set_job_fields(job_id, status='failed', error=traceback.format_exc(), finished_at=datetime.utcnow())
+    else:
+        db.session.commit()
+        _set_job_fields(job_id, status='succeeded', progress=1.0, result_path=path,
+                        finished_at=datetime.utcnow())
+
+
+# Job handlers
+
+@job_handler('export_transactions')
+def export_transactions(job):
+    """Export the ledger (optionally a date range) as a gzipped CSV"""
+    params = job.params
+    start = datetime.fromisoformat(params['start']) if params.get('start') else None
+    end = datetime.fromisoformat(params['end']) if params.get('end') else None
+
+    table = Transaction.__table__
+    conditions = []
+    if start is not None:
+        conditions.append(table.c.timestamp >= start)
+    if end is not None:
+        conditions.append(table.c.timestamp < end)
+    if params.get('product_id'):
+        conditions.append(table.c.product_id == params['product_id'])
+    total = db.session.execute(db.select(db.func.count()).select_from(table).where(*conditions)).scalar()
+
+    path = result_path(job, 'transactions.csv.gz')
+    with gzip.open(path, 'wt', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(['id', 'timestamp', 'product_id', 'user_id', 'action_type', 'quantity',
+                         'location_id', 'to_location_id', 'notes'])
+        rows = db.session.execute(
+            db.select(table).where(*conditions).order_by(table.c.timestamp).execution_options(yield_per=5000)
+        )
+        for count, row in enumerate(rows, 1):
+            writer.writerow([row.id, row.timestamp.isoformat(), row.product_id, row.user_id,
+                             row.action_type, row.quantity, row.location_id, row.to_location_id, row.notes])
+            if count % 10000 == 0:
+                report_progress(job, count / total, f'{count} of {total} rows')
+    return path
+
+
+@job_handler('import_products')
+def import_products(job):
+    """Create or update products from `params['rows']`, matched by SKU"""
+    rows = job.params.get('rows', [])
+    existing = {product.sku: product for product in Product.query.all()}
+    allocated = allocated_by_product()
+    created = updated = 0
+
+    for count, data in enumerate(rows, 1):
+        product = existing.get(data['sku'])
+        if product is None:
+            product = Product(
+                name=data['name'],
+                sku=data['sku'],
+                quantity=data.get('quantity', 0),
+                price=data['price'],
+                low_stock_threshold=data.get('low_stock_threshold', 10),
+                category_id=data['category_id'],
+                supplier_id=data['supplier_id']
+            )
+            db.session.add(product)
+            existing[product.sku] = product
+            change = product.quantity
+            created += 1
+        else:
+            old_quantity = product.quantity
+            for field in ('name', 'price', 'low_stock_threshold', 'category_id', 'supplier_id'):
+                if field in data:
+                    setattr(product, field, data[field])
+            if 'quantity' in data:
+                if data['quantity'] < allocated.get(product.id, 0):
+                    raise ValueError(f"{data['sku']}: quantity cannot be below the "
+                                     f"{allocated[product.id]} units held at locations")
+                product.quantity = data['quantity']
+            change = product.quantity - old_quantity
+            updated += 1
+
+        if change:
+            db.session.add(Transaction(
+                product=product,
+                user_id=job.user_id,
+                action_type='update' if product.id else 'add',
+                quantity=change,
+                notes=f'Imported by job {job.id}'
+            ))
+
+        if count % 1000 == 0:
+            db.session.flush()
+            report_progress(job, count / len(rows), f'{count} of {len(rows)} rows')
+
+    path = result_path(job, 'summary.json')
+    with open(path, 'wb') as handle:
+        handle.write(dumps({'created': created, 'updated': updated}))
+    return path
+
+
+@job_handler('low_stock_report')
+def low_stock_report(job):
+    """Write all low-stock products as a CSV report"""
+    path = result_path(job, 'low-stock.csv')
+    query = Product.query.filter(Product.quantity < Product.low_stock_threshold).order_by(Product.sku)
+    with open(path, 'w', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(['id', 'sku', 'name', 'quantity', 'low_stock_threshold', 'category_id', 'supplier_id'])
+        for product in query.yield_per(5000):
+            writer.writerow([product.id, product.sku, product.name, product.quantity,
+                             product.low_stock_threshold, product.category_id, product.supplier_id])
+    return path
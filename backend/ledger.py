@@ -0,0 +1,346 @@
+"""
+Ledger partitioning and archival for the transactions table.
+
+PostgreSQL: `transactions` is converted to a table partitioned by month on
+`timestamp`. Archiving a closed period detaches its partitions and attaches
+them to `transactions_archive`, which is partitioned the same way, so date
+range queries on either table only touch the relevant months.
+
+SQLite (and unpartitioned PostgreSQL): archiving moves rows older than the
+cutoff into `transactions_archive`.
+
+Both backends can export the archived rows as gzipped NDJSON files, one per
+month. Run with the Flask CLI, e.g.:
+
+    flask --app backend.app:create_app ledger partition --months-ahead 3
+    flask --app backend.app:create_app ledger archive --before 2024-01-01 --export-dir archive/
+"""
+import gzip
+import os
+import shutil
+from datetime import datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from backend.app import db
+from backend.models import Transaction, TransactionArchive
+from backend.representations import dumps
+
+ledger_cli = AppGroup('ledger', help='Partition and archive the transaction ledger.')
+
+LEDGER_COLUMNS = 'id, product_id, user_id, action_type, quantity, notes, timestamp, location_id, to_location_id'
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    month = value.month - 1 + months
+    return datetime(value.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(table, start):
+    return f'{table}_y{start.year}m{start.month:02d}'
+
+
+def parse_partition_name(table, name):
+    """Return the month a partition covers, or None for non-monthly partitions"""
+    prefix = f'{table}_y'
+    if not name.startswith(prefix):
+        return None
+    try:
+        return datetime.strptime(name[len(prefix):], '%Ym%m')
+    except ValueError:
+        return None
+
+
+def parse_date_range(args):
+    """Read `start`/`end` ISO dates from request args, raises ValueError if malformed"""
+    start = args.get('start')
+    end = args.get('end')
+    return (datetime.fromisoformat(start) if start else None,
+            datetime.fromisoformat(end) if end else None)
+
+
+def filter_date_range(query, model, start, end):
+    """Restrict a query to a timestamp range so PostgreSQL can prune partitions"""
+    if start is not None:
+        query = query.filter(model.timestamp >= start)
+    if end is not None:
+        query = query.filter(model.timestamp < end)
+    return query
+
+
+def is_postgresql():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def is_partitioned(table):
+    if not is_postgresql():
+        return False
+    return db.session.execute(text(
+        'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt '
+        'JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :name)'
+    ), {'name': table}).scalar()
+
+
+def list_partitions(table):
+    rows = db.session.execute(text(
+        'SELECT c.relname FROM pg_inherits i '
+        'JOIN pg_class c ON c.oid = i.inhrelid '
+        'JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :name'
+    ), {'name': table})
+    return [row[0] for row in rows]
+
+
+def default_partition(table):
+    return db.session.execute(text(
+        'SELECT c.relname FROM pg_inherits i '
+        'JOIN pg_class c ON c.oid = i.inhrelid '
+        'JOIN pg_class p ON p.oid = i.inhparent '
+        "WHERE p.relname = :name AND pg_get_expr(c.relpartbound, c.oid) = 'DEFAULT'"
+    ), {'name': table}).scalar()
+
+
+def create_partition(table, start):
+    """Create the monthly partition of `table` starting at `start` if it is missing.
+
+    PostgreSQL refuses to create a partition for a month that already has rows
+    in the default partition, so those rows are moved into the new partition.
+    """
+    name = partition_name(table, start)
+    end = add_months(start, 1)
+    if db.session.execute(text('SELECT to_regclass(:name) IS NOT NULL'), {'name': name}).scalar():
+        return
+    bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+
+    default = default_partition(table)
+    month_rows = {'start': start, 'end': end}
+    if default is None or not db.session.execute(text(
+        f'SELECT EXISTS (SELECT 1 FROM {default} WHERE timestamp >= :start AND timestamp < :end)'
+    ), month_rows).scalar():
+        db.session.execute(text(f'CREATE TABLE {name} PARTITION OF {table} {bounds}'))
+        return
+
+    try:
+        db.session.execute(text(f'ALTER TABLE {table} DETACH PARTITION {default}'))
+        db.session.execute(text(f'CREATE TABLE {name} PARTITION OF {table} {bounds}'))
+        db.session.execute(text(
+            f'INSERT INTO {name} ({LEDGER_COLUMNS}) SELECT {LEDGER_COLUMNS} FROM {default} '
+            'WHERE timestamp >= :start AND timestamp < :end'
+        ), month_rows)
+        db.session.execute(text(
+            f'DELETE FROM {default} WHERE timestamp >= :start AND timestamp < :end'
+        ), month_rows)
+        db.session.execute(text(f'ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT'))
+    except SQLAlchemyError as exc:
+        db.session.rollback()
+        raise click.ClickException(
+            f'Could not create partition {name}: rows for {start:%Y-%m} are in {default} '
+            f'and could not be moved out of it ({getattr(exc, "orig", exc)}).'
+        )
+
+
+def ensure_partitions(table, first, last):
+    """Create monthly partitions of `table` covering first..last inclusive"""
+    month = month_start(first)
+    while month <= last:
+        create_partition(table, month)
+        month = add_months(month, 1)
+
+
+def convert_to_partitioned():
+    """One-time conversion of a plain `transactions` table to monthly range partitions"""
+    oldest = db.session.execute(text('SELECT MIN(timestamp) FROM transactions')).scalar()
+    now = datetime.utcnow()
+
+    db.session.execute(text('ALTER TABLE transactions RENAME TO transactions_legacy'))
+    # Keep the id sequence alive when the legacy table is dropped
+    db.session.execute(text('ALTER SEQUENCE transactions_id_seq OWNED BY NONE'))
+    db.session.execute(text(
+        'CREATE TABLE transactions (LIKE transactions_legacy INCLUDING DEFAULTS) '
+        'PARTITION BY RANGE (timestamp)'
+    ))
+    db.session.execute(text('CREATE TABLE transactions_default PARTITION OF transactions DEFAULT'))
+    ensure_partitions('transactions', oldest or now, now)
+    db.session.execute(text(
+        f'INSERT INTO transactions ({LEDGER_COLUMNS}) '
+        'SELECT id, product_id, user_id, action_type, quantity, notes, COALESCE(timestamp, now()), '
+        'location_id, to_location_id FROM transactions_legacy'
+    ))
+    db.session.execute(text('DROP TABLE transactions_legacy'))
+
+    # Partitioned tables need the partition key in the primary key
+    db.session.execute(text('ALTER TABLE transactions ADD PRIMARY KEY (id, timestamp)'))
+    db.session.execute(text('ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id'))
+    db.session.execute(text(
+        'ALTER TABLE transactions ADD FOREIGN KEY (product_id) REFERENCES products (id)'
+    ))
+    db.session.execute(text(
+        'ALTER TABLE transactions ADD FOREIGN KEY (user_id) REFERENCES users (id)'
+    ))
+    db.session.execute(text(
+        'ALTER TABLE transactions ADD FOREIGN KEY (location_id) REFERENCES locations (id)'
+    ))
+    db.session.execute(text(
+        'ALTER TABLE transactions ADD FOREIGN KEY (to_location_id) REFERENCES locations (id)'
+    ))
+    db.session.execute(text('CREATE INDEX ix_transactions_product_id ON transactions (product_id)'))
+    db.session.execute(text('CREATE INDEX ix_transactions_timestamp ON transactions (timestamp)'))
+    db.session.execute(text('CREATE INDEX ix_transactions_location_id ON transactions (location_id)'))
+
+
+def partition_ledger(months_ahead=3):
+    """Partition the ledger (if needed) and pre-create upcoming monthly partitions"""
+    if not is_postgresql():
+        raise click.ClickException('Partitioning requires PostgreSQL; use `ledger archive` on SQLite.')
+
+    TransactionArchive.__table__.create(db.engine, checkfirst=True)
+    converted = False
+    if not is_partitioned('transactions'):
+        convert_to_partitioned()
+        converted = True
+
+    now = datetime.utcnow()
+    ensure_partitions('transactions', now, add_months(now, months_ahead))
+    db.session.commit()
+    return converted
+
+
+def partial_path(path):
+    return path + '.partial'
+
+
+def export_rows(rows, export_dir):
+    """Write rows to gzipped NDJSON files, one per month, returns the files to publish.
+
+    Rows go to `.partial` files first, `publish_exports` moves them into place
+    once the archive is committed and `discard_exports` removes them otherwise,
+    so a failed run that is retried does not export the same rows twice.
+    """
+    os.makedirs(export_dir, exist_ok=True)
+    written = set()
+    handle = None
+    current = None
+    try:
+        for row in rows:
+            month = month_start(row.timestamp)
+            if month != current:
+                if handle is not None:
+                    handle.close()
+                path = os.path.join(export_dir, f'transactions-{month:%Y-%m}.ndjson.gz')
+                handle = gzip.open(partial_path(path), 'ab' if path in written else 'wb')
+                written.add(path)
+                current = month
+            handle.write(dumps(dict(row._mapping)) + b'\n')
+    finally:
+        if handle is not None:
+            handle.close()
+    return sorted(written)
+
+
+def publish_exports(paths):
+    for path in paths:
+        if os.path.exists(path):
+            # Rows archived later for an already exported month, gzip members concatenate
+            with open(path, 'ab') as target, open(partial_path(path), 'rb') as source:
+                shutil.copyfileobj(source, target)
+            os.remove(partial_path(path))
+        else:
+            os.replace(partial_path(path), path)
+
+
+def discard_exports(paths):
+    for path in paths:
+        if os.path.exists(partial_path(path)):
+            os.remove(partial_path(path))
+
+
+def move_closed_periods(cutoff, drop):
+    """Move or drop ledger rows before `cutoff` in the current transaction, returns the count"""
+    moved = 0
+    if is_partitioned('transactions'):
+        # Closed months are moved as whole partitions, no rows are rewritten
+        for name in list_partitions('transactions'):
+            month = parse_partition_name('transactions', name)
+            if month is None or add_months(month, 1) > cutoff:
+                continue
+            moved += db.session.execute(text(f'SELECT COUNT(*) FROM {name}')).scalar()
+            db.session.execute(text(f'ALTER TABLE transactions DETACH PARTITION {name}'))
+            if drop:
+                db.session.execute(text(f'DROP TABLE {name}'))
+                continue
+            archived = partition_name('transactions_archive', month)
+            db.session.execute(text(f'ALTER TABLE {name} RENAME TO {archived}'))
+            db.session.execute(text(
+                f'ALTER TABLE transactions_archive ATTACH PARTITION {archived} '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            ))
+
+    # Rows outside monthly partitions (SQLite, or the PostgreSQL default partition)
+    oldest = db.session.query(db.func.min(Transaction.timestamp)).filter(Transaction.timestamp < cutoff).scalar()
+    if oldest is not None:
+        if not drop:
+            if is_partitioned('transactions_archive'):
+                ensure_partitions('transactions_archive', oldest, add_months(cutoff, -1))
+            db.session.execute(text(
+                f'INSERT INTO transactions_archive ({LEDGER_COLUMNS}) '
+                f'SELECT {LEDGER_COLUMNS} FROM transactions WHERE timestamp < :cutoff'
+            ), {'cutoff': cutoff})
+        moved += db.session.execute(
+            text('DELETE FROM transactions WHERE timestamp < :cutoff'), {'cutoff': cutoff}
+        ).rowcount
+
+    return moved
+
+
+def archive_ledger(before, export_dir=None, drop=False):
+    """Move transactions older than the month containing `before` out of the hot ledger"""
+    cutoff = month_start(before)
+    TransactionArchive.__table__.create(db.engine, checkfirst=True)
+
+    files = []
+    if export_dir:
+        table = Transaction.__table__
+        rows = db.session.execute(
+            db.select(table).where(table.c.timestamp < cutoff).order_by(table.c.timestamp)
+            .execution_options(yield_per=1000)
+        )
+        files = export_rows(rows, export_dir)
+
+    try:
+        moved = move_closed_periods(cutoff, drop)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        discard_exports(files)
+        raise
+    publish_exports(files)
+    return moved, files
+
+
+@ledger_cli.command('partition')
+@click.option('--months-ahead', default=3, show_default=True, help='Future monthly partitions to create.')
+def partition_command(months_ahead):
+    """Partition transactions by month (PostgreSQL)."""
+    converted = partition_ledger(months_ahead)
+    if converted:
+        click.echo('Converted transactions to a partitioned table.')
+    click.echo(f'Partitions ready through {add_months(datetime.utcnow(), months_ahead):%Y-%m}.')
+
+
+@ledger_cli.command('archive')
+@click.option('--before', required=True, type=click.DateTime(formats=['%Y-%m-%d', '%Y-%m']),
+              help='Archive whole months before the month containing this date.')
+@click.option('--export-dir', type=click.Path(file_okay=False), help='Also export rows as gzipped NDJSON.')
+@click.option('--drop', is_flag=True, help='Delete archived rows instead of keeping them in transactions_archive.')
+def archive_command(before, export_dir, drop):
+    """Move closed periods out of the hot ledger."""
+    if drop and not export_dir:
+        raise click.ClickException('--drop requires --export-dir, archived rows would be lost.')
+    moved, files = archive_ledger(before, export_dir, drop)
+    click.echo(f'Archived {moved} transactions before {month_start(before):%Y-%m}.')
+    for path in files:
+        click.echo(f'  wrote {path}')
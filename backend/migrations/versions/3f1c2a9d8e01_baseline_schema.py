@@ -0,0 +1,86 @@
+"""Baseline schema: users, categories, suppliers, products, transactions
+
+Revision ID: 3f1c2a9d8e01
+Revises:
+Create Date: 2024-06-03 09:00:00.000000
+
+Databases created with db.create_all() before migrations existed already
+have these tables, so each one is only created when it is missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d8e01'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not has_table('users'):
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('username', sa.String(length=80), nullable=False, unique=True),
+            sa.Column('email', sa.String(length=120), nullable=False, unique=True),
+            sa.Column('password_hash', sa.String(length=255), nullable=False),
+            sa.Column('role', sa.String(length=20), nullable=False),
+            sa.Column('created_at', sa.DateTime())
+        )
+    if not has_table('categories'):
+        op.create_table(
+            'categories',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('name', sa.String(length=100), nullable=False, unique=True),
+            sa.Column('description', sa.Text()),
+            sa.Column('created_at', sa.DateTime())
+        )
+    if not has_table('suppliers'):
+        op.create_table(
+            'suppliers',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('name', sa.String(length=100), nullable=False, unique=True),
+            sa.Column('contact_info', sa.Text()),
+            sa.Column('phone', sa.String(length=20)),
+            sa.Column('email', sa.String(length=120)),
+            sa.Column('created_at', sa.DateTime())
+        )
+    if not has_table('products'):
+        op.create_table(
+            'products',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('name', sa.String(length=200), nullable=False),
+            sa.Column('sku', sa.String(length=50), nullable=False, unique=True),
+            sa.Column('quantity', sa.Integer(), nullable=False),
+            sa.Column('price', sa.Float(), nullable=False),
+            sa.Column('low_stock_threshold', sa.Integer()),
+            sa.Column('category_id', sa.Integer(), sa.ForeignKey('categories.id'), nullable=False),
+            sa.Column('supplier_id', sa.Integer(), sa.ForeignKey('suppliers.id'), nullable=False),
+            sa.Column('created_at', sa.DateTime()),
+            sa.Column('updated_at', sa.DateTime())
+        )
+    if not has_table('transactions'):
+        op.create_table(
+            'transactions',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id'), nullable=False),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('action_type', sa.String(length=20), nullable=False),
+            sa.Column('quantity', sa.Integer(), nullable=False),
+            sa.Column('notes', sa.Text()),
+            sa.Column('timestamp', sa.DateTime())
+        )
+
+
+def downgrade():
+    op.drop_table('transactions')
+    op.drop_table('products')
+    op.drop_table('suppliers')
+    op.drop_table('categories')
+    op.drop_table('users')
@@ -0,0 +1,49 @@
+"""Add stock_alerts.sequence for commit-ordered alert streams
+
+Revision ID: 4a6c9e2b7d15
+Revises: 9d37f1b4c6a8
+Create Date: 2024-06-03 09:50:00.000000
+
+Existing alerts are numbered by ID and the `stock_alerts` counter in
+`stream_sequences` continues after them (see backend/alerts.py).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a6c9e2b7d15'
+down_revision = '9d37f1b4c6a8'
+branch_labels = None
+depends_on = None
+
+
+def has_column(table, name):
+    return any(column['name'] == name for column in sa.inspect(op.get_bind()).get_columns(table))
+
+
+def has_index(table, name):
+    return any(index['name'] == name for index in sa.inspect(op.get_bind()).get_indexes(table))
+
+
+def upgrade():
+    if not has_column('stock_alerts', 'sequence'):
+        op.add_column('stock_alerts', sa.Column('sequence', sa.BigInteger()))
+
+    alerts = sa.table('stock_alerts', sa.column('id', sa.Integer()), sa.column('sequence', sa.BigInteger()))
+    op.execute(alerts.update().where(alerts.c.sequence.is_(None)).values(sequence=alerts.c.id))
+    if not has_index('stock_alerts', 'ix_stock_alerts_sequence'):
+        op.create_index('ix_stock_alerts_sequence', 'stock_alerts', ['sequence'], unique=True)
+
+    op.execute(sa.text(
+        'INSERT INTO stream_sequences (channel, last_id) '
+        "SELECT 'stock_alerts', COALESCE(MAX(sequence), 0) FROM stock_alerts WHERE true "
+        'ON CONFLICT DO NOTHING'
+    ))
+
+
+def downgrade():
+    op.execute(sa.text("DELETE FROM stream_sequences WHERE channel = 'stock_alerts'"))
+    op.drop_index('ix_stock_alerts_sequence', table_name='stock_alerts')
+    with op.batch_alter_table('stock_alerts') as batch:
+        batch.drop_column('sequence')
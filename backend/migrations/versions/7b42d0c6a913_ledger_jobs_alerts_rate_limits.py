@@ -0,0 +1,104 @@
+"""Ledger indexes and archive, background jobs, stock alerts, rate limits
+
+Revision ID: 7b42d0c6a913
+Revises: 3f1c2a9d8e01
+Create Date: 2024-06-03 09:10:00.000000
+
+Tables and indexes that db.create_all() may already have created are
+skipped.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b42d0c6a913'
+down_revision = '3f1c2a9d8e01'
+branch_labels = None
+depends_on = None
+
+
+def has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def has_index(table, name):
+    return any(index['name'] == name for index in sa.inspect(op.get_bind()).get_indexes(table))
+
+
+def create_index(name, table, columns):
+    if not has_index(table, name):
+        op.create_index(name, table, columns)
+
+
+def upgrade():
+    create_index('ix_transactions_product_id', 'transactions', ['product_id'])
+    create_index('ix_transactions_timestamp', 'transactions', ['timestamp'])
+
+    if not has_table('transactions_archive'):
+        # Partitioned like `transactions` on PostgreSQL (see backend/ledger.py)
+        op.create_table(
+            'transactions_archive',
+            sa.Column('id', sa.Integer(), nullable=False, autoincrement=False),
+            sa.Column('product_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('action_type', sa.String(length=20), nullable=False),
+            sa.Column('quantity', sa.Integer(), nullable=False),
+            sa.Column('notes', sa.Text()),
+            sa.Column('timestamp', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id', 'timestamp'),
+            postgresql_partition_by='RANGE (timestamp)'
+        )
+    create_index('ix_transactions_archive_product_id', 'transactions_archive', ['product_id'])
+
+    if not has_table('jobs'):
+        op.create_table(
+            'jobs',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('kind', sa.String(length=50), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('params', sa.JSON(), nullable=False),
+            sa.Column('progress', sa.Float(), nullable=False),
+            sa.Column('message', sa.Text()),
+            sa.Column('error', sa.Text()),
+            sa.Column('result_path', sa.String(length=500)),
+            sa.Column('worker', sa.String(length=100)),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id')),
+            sa.Column('created_at', sa.DateTime()),
+            sa.Column('started_at', sa.DateTime()),
+            sa.Column('finished_at', sa.DateTime()),
+            sa.Column('updated_at', sa.DateTime())
+        )
+    create_index('ix_jobs_status', 'jobs', ['status'])
+
+    if not has_table('stock_alerts'):
+        op.create_table(
+            'stock_alerts',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id', ondelete='CASCADE'),
+                      nullable=False),
+            sa.Column('kind', sa.String(length=20), nullable=False),
+            sa.Column('quantity', sa.Integer(), nullable=False),
+            sa.Column('threshold', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime()),
+            sa.Column('delivered_at', sa.DateTime())
+        )
+    create_index('ix_stock_alerts_product_id', 'stock_alerts', ['product_id'])
+    create_index('ix_stock_alerts_delivered_at', 'stock_alerts', ['delivered_at'])
+
+    if not has_table('rate_limits'):
+        op.create_table(
+            'rate_limits',
+            sa.Column('key', sa.String(length=200), primary_key=True),
+            sa.Column('tokens', sa.Float(), nullable=False),
+            sa.Column('updated_at', sa.Float(), nullable=False)
+        )
+
+
+def downgrade():
+    op.drop_table('rate_limits')
+    op.drop_table('stock_alerts')
+    op.drop_table('jobs')
+    op.drop_table('transactions_archive')
+    op.drop_index('ix_transactions_timestamp', table_name='transactions')
+    op.drop_index('ix_transactions_product_id', table_name='transactions')
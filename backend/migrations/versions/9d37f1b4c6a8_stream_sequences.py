@@ -0,0 +1,29 @@
+"""Add stream_sequences for commit-ordered stock stream event IDs
+
+Revision ID: 9d37f1b4c6a8
+Revises: e2a94b6c0f57
+Create Date: 2024-06-03 09:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d37f1b4c6a8'
+down_revision = 'e2a94b6c0f57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('stream_sequences'):
+        op.create_table(
+            'stream_sequences',
+            sa.Column('channel', sa.String(length=63), primary_key=True),
+            sa.Column('last_id', sa.BigInteger(), nullable=False)
+        )
+
+
+def downgrade():
+    op.drop_table('stream_sequences')
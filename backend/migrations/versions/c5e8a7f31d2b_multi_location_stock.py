@@ -0,0 +1,82 @@
+"""Multi-location stock: locations, stock_levels and transaction locations
+
+Revision ID: c5e8a7f31d2b
+Revises: 7b42d0c6a913
+Create Date: 2024-06-03 09:20:00.000000
+
+On a partitioned PostgreSQL ledger the new columns are added to the
+partitioned parents and PostgreSQL adds them to every partition, so
+partitions detached later still match `transactions_archive`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e8a7f31d2b'
+down_revision = '7b42d0c6a913'
+branch_labels = None
+depends_on = None
+
+
+def has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def has_column(table, name):
+    return any(column['name'] == name for column in sa.inspect(op.get_bind()).get_columns(table))
+
+
+def has_index(table, name):
+    return any(index['name'] == name for index in sa.inspect(op.get_bind()).get_indexes(table))
+
+
+def upgrade():
+    if not has_table('locations'):
+        op.create_table(
+            'locations',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('name', sa.String(length=100), nullable=False, unique=True),
+            sa.Column('code', sa.String(length=20), nullable=False, unique=True),
+            sa.Column('address', sa.Text()),
+            sa.Column('created_at', sa.DateTime())
+        )
+
+    if not has_table('stock_levels'):
+        op.create_table(
+            'stock_levels',
+            sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id', ondelete='CASCADE'),
+                      primary_key=True),
+            sa.Column('location_id', sa.Integer(), sa.ForeignKey('locations.id'), primary_key=True),
+            sa.Column('quantity', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime())
+        )
+    if not has_index('stock_levels', 'ix_stock_levels_location_rollup'):
+        op.create_index('ix_stock_levels_location_rollup', 'stock_levels',
+                        ['location_id', 'product_id', 'quantity'])
+
+    missing = [name for name in ('location_id', 'to_location_id') if not has_column('transactions', name)]
+    if missing:
+        # Plain ALTERs on PostgreSQL, a table rebuild on SQLite
+        with op.batch_alter_table('transactions') as batch:
+            for name in missing:
+                batch.add_column(sa.Column(name, sa.Integer()))
+                batch.create_foreign_key(f'fk_transactions_{name}', 'locations', [name], ['id'])
+    if not has_index('transactions', 'ix_transactions_location_id'):
+        op.create_index('ix_transactions_location_id', 'transactions', ['location_id'])
+
+    if not has_column('transactions_archive', 'location_id'):
+        op.add_column('transactions_archive', sa.Column('location_id', sa.Integer()))
+    if not has_column('transactions_archive', 'to_location_id'):
+        op.add_column('transactions_archive', sa.Column('to_location_id', sa.Integer()))
+
+
+def downgrade():
+    op.drop_column('transactions_archive', 'to_location_id')
+    op.drop_column('transactions_archive', 'location_id')
+    op.drop_index('ix_transactions_location_id', table_name='transactions')
+    with op.batch_alter_table('transactions') as batch:
+        batch.drop_column('to_location_id')
+        batch.drop_column('location_id')
+    op.drop_table('stock_levels')
+    op.drop_table('locations')
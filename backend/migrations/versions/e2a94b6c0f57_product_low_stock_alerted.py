@@ -0,0 +1,42 @@
+"""Add products.low_stock_alerted
+
+Revision ID: e2a94b6c0f57
+Revises: c5e8a7f31d2b
+Create Date: 2024-06-03 09:30:00.000000
+
+Backfilled from the current stock so products that are already low do
+not emit a `low` alert on their next change (see backend/alerts.py).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a94b6c0f57'
+down_revision = 'c5e8a7f31d2b'
+branch_labels = None
+depends_on = None
+
+
+def has_column(table, name):
+    return any(column['name'] == name for column in sa.inspect(op.get_bind()).get_columns(table))
+
+
+def upgrade():
+    if has_column('products', 'low_stock_alerted'):
+        return
+
+    op.add_column('products', sa.Column('low_stock_alerted', sa.Boolean(), nullable=False,
+                                        server_default=sa.false()))
+
+    products = sa.table('products', sa.column('quantity', sa.Integer()),
+                        sa.column('low_stock_threshold', sa.Integer()),
+                        sa.column('low_stock_alerted', sa.Boolean()))
+    op.execute(products.update().where(
+        products.c.quantity < sa.func.coalesce(products.c.low_stock_threshold, 0)
+    ).values(low_stock_alerted=True))
+
+
+def downgrade():
+    with op.batch_alter_table('products') as batch:
+        batch.drop_column('low_stock_alerted')
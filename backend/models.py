@@ -26,7 +26,7 @@ class User(db.Model):
             'username': self.username,
             'email': self.email,
             'role': self.role,
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at
         }
 
 class Category(db.Model):
@@ -45,7 +45,7 @@ class Category(db.Model):
             'name': self.name,
             'description': self.description,
             'product_count': len(self.products),
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at
         }
 
 class Supplier(db.Model):
@@ -68,7 +68,7 @@ class Supplier(db.Model):
             'phone': self.phone,
             'email': self.email,
             'product_count': len(self.products),
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at
         }
 
 class Product(db.Model):
@@ -80,12 +80,14 @@ class Product(db.Model):
     quantity = db.Column(db.Integer, nullable=False, default=0)
     price = db.Column(db.Float, nullable=False)
     low_stock_threshold = db.Column(db.Integer, default=10)
+    low_stock_alerted = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())  # see backend/alerts.py
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
     supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     transactions = db.relationship('Transaction', backref='product', lazy=True)
+    stock_levels = db.relationship('StockLevel', backref='product', lazy=True, passive_deletes=True)
     
     @property
     def is_low_stock(self):
@@ -102,20 +104,23 @@ class Product(db.Model):
             'is_low_stock': self.is_low_stock,
             'category': self.category.to_dict() if self.category else None,
             'supplier': self.supplier.to_dict() if self.supplier else None,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
     
     id = db.Column(db.Integer, primary_key=True)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    action_type = db.Column(db.String(20), nullable=False)  # add, remove, update
+    action_type = db.Column(db.String(20), nullable=False)  # add, remove, update, transfer
     quantity = db.Column(db.Integer, nullable=False)
     notes = db.Column(db.Text)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    # Location stock was added to or removed from (source of a transfer), NULL for unallocated stock
+    location_id = db.Column(db.Integer, db.ForeignKey('locations.id'), index=True)
+    to_location_id = db.Column(db.Integer, db.ForeignKey('locations.id'))  # transfer destination
     
     def to_dict(self):
         return {
@@ -124,6 +129,156 @@ class Transaction(db.Model):
             'user': self.user.to_dict() if self.user else None,
             'action_type': self.action_type,
             'quantity': self.quantity,
+            'location_id': self.location_id,
+            'to_location_id': self.to_location_id,
             'notes': self.notes,
-            'timestamp': self.timestamp.isoformat()
+            'timestamp': self.timestamp
         }
+
+class Location(db.Model):
+    """Warehouse or other place stock is held (see backend/stock.py)"""
+    __tablename__ = 'locations'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    code = db.Column(db.String(20), unique=True, nullable=False)
+    address = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'code': self.code,
+            'address': self.address,
+            'created_at': self.created_at
+        }
+
+class StockLevel(db.Model):
+    """Quantity of a product held at a location, Product.quantity is the total over all locations"""
+    __tablename__ = 'stock_levels'
+    # Covers per-location rollups without touching the table
+    __table_args__ = (db.Index('ix_stock_levels_location_rollup', 'location_id', 'product_id', 'quantity'),)
+    
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    location_id = db.Column(db.Integer, db.ForeignKey('locations.id'), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    location = db.relationship('Location')
+    
+    def to_dict(self):
+        return {
+            'product_id': self.product_id,
+            'location_id': self.location_id,
+            'location': self.location.name if self.location else None,
+            'quantity': self.quantity,
+            'updated_at': self.updated_at
+        }
+
+class TransactionArchive(db.Model):
+    """Closed-period transactions moved out of the hot ledger (see backend/ledger.py)"""
+    __tablename__ = 'transactions_archive'
+    # On PostgreSQL the archive holds the detached monthly partitions of `transactions`
+    __table_args__ = {'postgresql_partition_by': 'RANGE (timestamp)'}
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    product_id = db.Column(db.Integer, nullable=False, index=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    action_type = db.Column(db.String(20), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    notes = db.Column(db.Text)
+    timestamp = db.Column(db.DateTime, primary_key=True)
+    location_id = db.Column(db.Integer)
+    to_location_id = db.Column(db.Integer)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'product_id': self.product_id,
+            'user_id': self.user_id,
+            'action_type': self.action_type,
+            'quantity': self.quantity,
+            'location_id': self.location_id,
+            'to_location_id': self.to_location_id,
+            'notes': self.notes,
+            'timestamp': self.timestamp
+        }
+
+class Job(db.Model):
+    """Background job queued in the database and executed by backend/worker.py"""
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, succeeded, failed
+    params = db.Column(db.JSON, nullable=False, default=dict)
+    progress = db.Column(db.Float, nullable=False, default=0.0)
+    message = db.Column(db.Text)
+    error = db.Column(db.Text)
+    result_path = db.Column(db.String(500))
+    worker = db.Column(db.String(100))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'params': self.params,
+            'progress': self.progress,
+            'message': self.message,
+            'error': self.error,
+            'has_result': self.result_path is not None,
+            'user_id': self.user_id,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+class StockAlert(db.Model):
+    """Emitted once each time a product crosses its low stock threshold"""
+    __tablename__ = 'stock_alerts'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # low, recovered
+    quantity = db.Column(db.Integer, nullable=False)
+    threshold = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    delivered_at = db.Column(db.DateTime, index=True)  # webhook outbox, NULL until delivered
+    sequence = db.Column(db.BigInteger, index=True, unique=True)  # commit order, assigned just before commit
+    
+    product = db.relationship('Product', backref=db.backref('alerts', lazy=True, passive_deletes=True))
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'sequence': self.sequence,
+            'product_id': self.product_id,
+            'sku': self.product.sku if self.product else None,
+            'kind': self.kind,
+            'quantity': self.quantity,
+            'threshold': self.threshold,
+            'created_at': self.created_at
+        }
+
+class RateLimit(db.Model):
+    """Token bucket state shared by all workers when RATELIMIT_STORAGE=database"""
+    __tablename__ = 'rate_limits'
+    
+    key = db.Column(db.String(200), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False)  # epoch seconds
+
+class StreamSequence(db.Model):
+    """Last number handed out per ordered stream: stock events by NOTIFY channel
+    (backend/broadcast.py) and stock alerts (backend/alerts.py)"""
+    __tablename__ = 'stream_sequences'
+    
+    channel = db.Column(db.String(63), primary_key=True)
+    last_id = db.Column(db.BigInteger, nullable=False, default=0)
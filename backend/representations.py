@@ -0,0 +1,64 @@
+"""
+Response representations for the Flask-RESTX API.
+
+Uses orjson when it is installed (native datetime support, much faster than
+the stdlib encoder) and falls back to the stdlib json module otherwise.
+Large list payloads are streamed to the client in chunks instead of being
+encoded into one big string.
+"""
+from datetime import date, datetime
+from itertools import islice
+from flask import Response, current_app, make_response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+    import json
+
+
+def _default(obj):
+    """Fallback for types the stdlib encoder does not understand"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+if orjson is not None:
+    def dumps(data):
+        return orjson.dumps(data, default=_default)
+else:
+    def dumps(data):
+        return json.dumps(data, default=_default, separators=(',', ':')).encode('utf-8')
+
+
+def iter_json_list(items, chunk_size=500):
+    """Yield a JSON array as byte chunks, encoding `chunk_size` items at a time"""
+    iterator = iter(items)
+    yield b'['
+    first = True
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            break
+        # Encode the chunk as an array and drop its brackets
+        body = dumps(chunk)[1:-1]
+        if not first:
+            yield b','
+        yield body
+        first = False
+    yield b']\n'
+
+
+def output_json(data, code, headers=None):
+    """Makes a Flask response with a JSON encoded body"""
+    threshold = current_app.config.get('JSON_STREAM_THRESHOLD', 1000)
+
+    if isinstance(data, list) and len(data) > threshold:
+        chunk_size = current_app.config.get('JSON_STREAM_CHUNK_SIZE', 500)
+        resp = Response(iter_json_list(data, chunk_size), status=code, mimetype='application/json')
+    else:
+        resp = make_response(dumps(data) + b'\n', code)
+
+    resp.headers.extend(headers or {})
+    return resp
@@ -0,0 +1,75 @@
+import time
+from flask import current_app, request
+from flask_restx import Namespace, Resource
+from flask_jwt_extended import jwt_required
+from backend.app import db
+from backend.models import StockAlert
+from backend.alerts import alerts_after, wait_for_alerts
+from backend.representations import dumps
+from backend.throttle import STREAM_TOKEN_LOCATIONS, open_stream
+
+alerts_ns = Namespace('alerts', description='Low stock alert operations')
+
+alerts_parser = alerts_ns.parser()
+alerts_parser.add_argument('after', type=int, location='args', help='Only alerts with a greater sequence, in commit order')
+alerts_parser.add_argument('limit', type=int, location='args', default=100)
+
+@alerts_ns.route('/')
+class AlertList(Resource):
+    @jwt_required()
+    @alerts_ns.expect(alerts_parser)
+    @alerts_ns.doc('list_alerts', security='Bearer')
+    def get(self):
+        """List low stock alerts, newest first unless `after` is given"""
+        args = alerts_parser.parse_args()
+        limit = min(args['limit'] or 100, 1000)
+
+        if args['after'] is not None:
+            alerts = alerts_after(args['after'], limit)
+        else:
+            alerts = StockAlert.query.order_by(StockAlert.id.desc()).limit(limit).all()
+        return [alert.to_dict() for alert in alerts], 200
+
+@alerts_ns.route('/stream')
+class AlertStream(Resource):
+    @jwt_required(locations=STREAM_TOKEN_LOCATIONS)
+    @alerts_ns.doc('stream_alerts', security='Bearer',
+                   params={'last_event_id': 'Resume after this alert sequence (or send the Last-Event-ID header)',
+                           'jwt': 'Access token, for EventSource clients that cannot send headers'})
+    def get(self):
+        """Stream low stock alerts as Server-Sent Events"""
+        last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        if last_id is not None:
+            try:
+                last_id = int(last_id)
+            except ValueError:
+                return {'message': 'Invalid last event ID'}, 400
+        else:
+            # New subscribers only receive alerts from now on
+            last_id = db.session.query(db.func.max(StockAlert.sequence)).scalar() or 0
+            db.session.close()
+
+        poll_interval = current_app.config['ALERT_STREAM_POLL_INTERVAL']
+        keepalive = current_app.config['STREAM_KEEPALIVE']
+
+        def generate():
+            nonlocal last_id
+            last_sent = time.monotonic()
+            while True:
+                alerts = alerts_after(last_id)
+                for alert in alerts:
+                    last_id = alert.sequence
+                    yield f'id: {alert.sequence}\nevent: {alert.kind}\ndata: '.encode() + dumps(alert.to_dict()) + b'\n\n'
+                # Don't hold a connection or snapshot open while idle
+                db.session.close()
+
+                if alerts:
+                    last_sent = time.monotonic()
+                    continue
+                if time.monotonic() - last_sent >= keepalive:
+                    last_sent = time.monotonic()
+                    yield b': keepalive\n\n'
+                # Alerts from other processes are picked up at the next poll
+                wait_for_alerts(poll_interval)
+
+        return open_stream(generate)
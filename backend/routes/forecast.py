@@ -0,0 +1,62 @@
+from flask import request
+from flask_restx import Namespace, Resource, fields
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from backend.forecasting import DEFAULTS, compute_reorder_points, forecast_params, suggestions
+from backend.jobs import submit_job
+from backend.throttle import coalesce
+from backend.routes.users import admin_required
+
+forecast_ns = Namespace('forecast', description='Demand forecasting and reorder point operations')
+
+forecast_parser = forecast_ns.parser()
+forecast_parser.add_argument('window_days', type=int, location='args', help='Days of history to use', default=DEFAULTS['window_days'])
+forecast_parser.add_argument('lead_time_days', type=float, location='args', help='Replenishment lead time', default=DEFAULTS['lead_time_days'])
+forecast_parser.add_argument('service_level', type=float, location='args', help='Target probability of not stocking out', default=DEFAULTS['service_level'])
+forecast_parser.add_argument('method', type=str, location='args', help='ewma, moving_average or mean', default=DEFAULTS['method'])
+forecast_parser.add_argument('alpha', type=float, location='args', help='Smoothing factor for ewma', default=DEFAULTS['alpha'])
+forecast_parser.add_argument('ma_days', type=int, location='args', help='Moving average length', default=DEFAULTS['ma_days'])
+
+apply_model = forecast_ns.model('ApplyReorderPoints', {
+    'window_days': fields.Integer(description='Days of history to use'),
+    'lead_time_days': fields.Float(description='Replenishment lead time'),
+    'service_level': fields.Float(description='Target probability of not stocking out'),
+    'method': fields.String(description='ewma, moving_average or mean'),
+    'alpha': fields.Float(description='Smoothing factor for ewma'),
+    'ma_days': fields.Integer(description='Moving average length'),
+    'include_without_demand': fields.Boolean(description='Also update products with no demand in the window', default=False)
+})
+
+@forecast_ns.route('/reorder-points')
+class ReorderPoints(Resource):
+    @jwt_required()
+    @coalesce
+    @forecast_ns.expect(forecast_parser)
+    @forecast_ns.doc('get_reorder_points', security='Bearer')
+    def get(self):
+        """Suggested reorder points for the whole catalog"""
+        try:
+            params = forecast_params(request.args)
+        except ValueError as error:
+            return {'message': str(error)}, 400
+        
+        catalog, result = compute_reorder_points(params)
+        return suggestions(catalog, result), 200
+
+@forecast_ns.route('/apply')
+class ApplyReorderPoints(Resource):
+    @jwt_required()
+    @forecast_ns.expect(apply_model)
+    @forecast_ns.doc('apply_reorder_points', security='Bearer')
+    def post(self):
+        """Write suggested reorder points to low stock thresholds (Admin only, runs as a job)"""
+        if not admin_required():
+            return {'message': 'Admin access required'}, 403
+        
+        data = request.get_json() or {}
+        try:
+            forecast_params(data)
+        except ValueError as error:
+            return {'message': str(error)}, 400
+        
+        job = submit_job('apply_reorder_points', data, get_jwt_identity())
+        return job.to_dict(), 202
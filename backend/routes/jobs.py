@@ -0,0 +1,77 @@
+import os
+from flask import request, send_file
+from flask_restx import Namespace, Resource, fields
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from backend.models import Job
+from backend.jobs import ADMIN_ONLY_KINDS, HANDLERS, submit_job
+from backend.routes.users import admin_required
+
+jobs_ns = Namespace('jobs', description='Background job operations')
+
+job_model = jobs_ns.model('Job', {
+    'kind': fields.String(required=True, description='Job kind (export_transactions, import_products, low_stock_report)'),
+    'params': fields.Raw(description='Job parameters')
+})
+
+def get_own_job(id):
+    """Return the job if the current user may see it, else None"""
+    job = Job.query.get(id)
+    if not job:
+        return None
+    if job.user_id != get_jwt_identity() and not admin_required():
+        return None
+    return job
+
+@jobs_ns.route('/')
+class JobList(Resource):
+    @jwt_required()
+    @jobs_ns.doc('list_jobs', security='Bearer')
+    def get(self):
+        """List the current user's recent jobs"""
+        jobs = Job.query.filter_by(user_id=get_jwt_identity()).order_by(Job.id.desc()).limit(50).all()
+        return [job.to_dict() for job in jobs], 200
+
+    @jwt_required()
+    @jobs_ns.expect(job_model)
+    @jobs_ns.doc('submit_job', security='Bearer')
+    def post(self):
+        """Queue a background job"""
+        data = request.get_json()
+
+        if data.get('kind') not in HANDLERS:
+            return {'message': f"Unknown job kind, expected one of: {', '.join(sorted(HANDLERS))}"}, 400
+
+        if data['kind'] in ADMIN_ONLY_KINDS and not admin_required():
+            return {'message': 'Admin access required'}, 403
+
+        job = submit_job(data['kind'], data.get('params', {}), get_jwt_identity())
+        return job.to_dict(), 202
+
+@jobs_ns.route('/<int:id>')
+class JobDetail(Resource):
+    @jwt_required()
+    @jobs_ns.doc('get_job', security='Bearer')
+    def get(self, id):
+        """Get job status and progress"""
+        job = get_own_job(id)
+        if not job:
+            return {'message': 'Job not found'}, 404
+        return job.to_dict(), 200
+
+@jobs_ns.route('/<int:id>/result')
+class JobResult(Resource):
+    @jwt_required()
+    @jobs_ns.doc('get_job_result', security='Bearer')
+    def get(self, id):
+        """Download a finished job's result file"""
+        job = get_own_job(id)
+        if not job:
+            return {'message': 'Job not found'}, 404
+
+        if job.status != 'succeeded':
+            return {'message': f'Job is {job.status}'}, 409
+
+        if not job.result_path or not os.path.exists(job.result_path):
+            return {'message': 'Job has no result'}, 404
+
+        return send_file(job.result_path, as_attachment=True)
@@ -0,0 +1,123 @@
+from flask import request
+from flask_restx import Namespace, Resource, fields
+from flask_jwt_extended import jwt_required
+from backend.app import db
+from backend.throttle import coalesce
+from backend.models import Location, Product, StockLevel, Transaction
+from backend.stock import location_stock, location_summary, product_availability
+
+locations_ns = Namespace('locations', description='Location and per-location stock operations')
+
+location_model = locations_ns.model('Location', {
+    'name': fields.String(required=True, description='Location name'),
+    'code': fields.String(required=True, description='Short unique code, e.g. WH-EAST'),
+    'address': fields.String(description='Location address')
+})
+
+@locations_ns.route('/')
+class LocationList(Resource):
+    @jwt_required()
+    @locations_ns.doc('list_locations', security='Bearer')
+    def get(self):
+        """List all locations"""
+        locations = Location.query.order_by(Location.name).all()
+        return [location.to_dict() for location in locations], 200
+    
+    @jwt_required()
+    @locations_ns.expect(location_model)
+    @locations_ns.doc('create_location', security='Bearer')
+    def post(self):
+        """Create a new location"""
+        data = request.get_json()
+        
+        if Location.query.filter((Location.name == data['name']) | (Location.code == data['code'])).first():
+            return {'message': 'Location name or code already exists'}, 400
+        
+        location = Location(
+            name=data['name'],
+            code=data['code'],
+            address=data.get('address', '')
+        )
+        
+        db.session.add(location)
+        db.session.commit()
+        
+        return location.to_dict(), 201
+
+@locations_ns.route('/<int:id>')
+class LocationDetail(Resource):
+    @jwt_required()
+    @locations_ns.doc('get_location', security='Bearer')
+    def get(self, id):
+        """Get location by ID"""
+        location = Location.query.get(id)
+        if not location:
+            return {'message': 'Location not found'}, 404
+        return location.to_dict(), 200
+    
+    @jwt_required()
+    @locations_ns.expect(location_model)
+    @locations_ns.doc('update_location', security='Bearer')
+    def put(self, id):
+        """Update a location"""
+        location = Location.query.get(id)
+        if not location:
+            return {'message': 'Location not found'}, 404
+        
+        data = request.get_json()
+        location.name = data.get('name', location.name)
+        location.code = data.get('code', location.code)
+        location.address = data.get('address', location.address)
+        
+        db.session.commit()
+        return location.to_dict(), 200
+    
+    @jwt_required()
+    @locations_ns.doc('delete_location', security='Bearer')
+    def delete(self, id):
+        """Delete a location"""
+        location = Location.query.get(id)
+        if not location:
+            return {'message': 'Location not found'}, 404
+        
+        if StockLevel.query.filter(StockLevel.location_id == id, StockLevel.quantity > 0).first():
+            return {'message': 'Cannot delete location holding stock'}, 400
+        if Transaction.query.filter((Transaction.location_id == id) | (Transaction.to_location_id == id)).first():
+            return {'message': 'Cannot delete location with transactions'}, 400
+        
+        StockLevel.query.filter_by(location_id=id).delete()
+        db.session.delete(location)
+        db.session.commit()
+        
+        return {'message': 'Location deleted successfully'}, 200
+
+@locations_ns.route('/<int:id>/stock')
+class LocationStock(Resource):
+    @jwt_required()
+    @coalesce
+    @locations_ns.doc('get_location_stock', security='Bearer')
+    def get(self, id):
+        """List products in stock at a location"""
+        if not Location.query.get(id):
+            return {'message': 'Location not found'}, 404
+        return location_stock(id), 200
+
+@locations_ns.route('/summary')
+class LocationSummary(Resource):
+    @jwt_required()
+    @coalesce
+    @locations_ns.doc('get_location_summary', security='Bearer')
+    def get(self):
+        """Total and per-location stock across the catalog"""
+        return location_summary(), 200
+
+@locations_ns.route('/product/<int:product_id>')
+class ProductAvailability(Resource):
+    @jwt_required()
+    @locations_ns.doc('get_product_availability', security='Bearer')
+    def get(self, product_id):
+        """Total and per-location availability of a product"""
+        product = Product.query.get(product_id)
+        if not product:
+            return {'message': 'Product not found'}, 404
+        return product_availability(product), 200
@@ -2,7 +2,9 @@ from flask import request
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from backend.app import db
-from backend.models import Product, Transaction, User
+from backend.throttle import coalesce
+from backend.models import Location, Product, Transaction, User
+from backend.stock import change_level, lock_product, set_total
 
 products_ns = Namespace('products', description='Product management operations')
 
@@ -14,12 +16,14 @@ product_model = products_ns.model('Product', {
     'price': fields.Float(required=True, description='Product price'),
     'low_stock_threshold': fields.Integer(description='Low stock alert threshold', default=10),
     'category_id': fields.Integer(required=True, description='Category ID'),
-    'supplier_id': fields.Integer(required=True, description='Supplier ID')
+    'supplier_id': fields.Integer(required=True, description='Supplier ID'),
+    'location_id': fields.Integer(description='Location holding the initial quantity (omit for unallocated stock)')
 })
 
 @products_ns.route('/')
 class ProductList(Resource):
     @jwt_required()
+    @coalesce
     @products_ns.doc('list_products', security='Bearer')
     def get(self):
         """List all products"""
@@ -37,6 +41,10 @@ class ProductList(Resource):
         if Product.query.filter_by(sku=data['sku']).first():
             return {'message': 'SKU already exists'}, 400
         
+        location_id = data.get('location_id')
+        if location_id is not None and not Location.query.get(location_id):
+            return {'message': 'Location not found'}, 404
+        
         product = Product(
             name=data['name'],
             sku=data['sku'],
@@ -48,6 +56,13 @@ class ProductList(Resource):
         )
         
         db.session.add(product)
+        if location_id is not None:
+            db.session.flush()
+            try:
+                change_level(product, location_id, data['quantity'])
+            except ValueError as error:
+                db.session.rollback()
+                return {'message': str(error)}, 400
         db.session.commit()
         
         # Log transaction
@@ -56,6 +71,7 @@ class ProductList(Resource):
             user_id=current_user_id,
             action_type='add',
             quantity=data['quantity'],
+            location_id=location_id,
             notes='Initial product creation'
         )
         db.session.add(transaction)
@@ -79,7 +95,7 @@ class ProductDetail(Resource):
     @products_ns.doc('update_product', security='Bearer')
     def put(self, id):
         """Update a product"""
-        product = Product.query.get(id)
+        product = lock_product(id)
         if not product:
             return {'message': 'Product not found'}, 404
         
@@ -88,9 +104,16 @@ class ProductDetail(Resource):
         
         old_quantity = product.quantity
         
+        # Quantity edits change unallocated stock, location stock moves through transactions
+        if data.get('quantity') is not None:
+            try:
+                set_total(product, data['quantity'])
+            except ValueError as error:
+                db.session.rollback()
+                return {'message': str(error)}, 400
+        
         product.name = data.get('name', product.name)
         product.sku = data.get('sku', product.sku)
-        product.quantity = data.get('quantity', product.quantity)
         product.price = data.get('price', product.price)
         product.low_stock_threshold = data.get('low_stock_threshold', product.low_stock_threshold)
         product.category_id = data.get('category_id', product.category_id)
@@ -128,6 +151,7 @@ class ProductDetail(Resource):
 @products_ns.route('/low-stock')
 class LowStockProducts(Resource):
     @jwt_required()
+    @coalesce
     @products_ns.doc('get_low_stock_products', security='Bearer')
     def get(self):
         """Get products with low stock"""
@@ -0,0 +1,71 @@
+from flask import current_app, request
+from flask_restx import Namespace, Resource
+from flask_jwt_extended import jwt_required
+from backend.broadcast import get_broadcaster
+from backend.representations import dumps
+from backend.throttle import STREAM_TOKEN_LOCATIONS, open_stream
+
+stream_ns = Namespace('stream', description='Live update streams')
+
+stock_parser = stream_ns.parser()
+stock_parser.add_argument('category_id', type=int, location='args', help='Only products in this category')
+stock_parser.add_argument('supplier_id', type=int, location='args', help='Only products from this supplier')
+stock_parser.add_argument('product_id', type=int, location='args', help='Only this product')
+stock_parser.add_argument('location_id', type=int, location='args', help='Only stock changes at this location')
+stock_parser.add_argument('last_event_id', type=int, location='args',
+                          help='Resume after this event ID (or send the Last-Event-ID header)')
+stock_parser.add_argument('jwt', type=str, location='args',
+                          help='Access token, for EventSource clients that cannot send headers')
+
+def format_event(item):
+    return f'id: {item["id"]}\nevent: {item["type"]}\ndata: '.encode() + dumps(item) + b'\n\n'
+
+@stream_ns.route('/stock')
+class StockStream(Resource):
+    @jwt_required(locations=STREAM_TOKEN_LOCATIONS)
+    @stream_ns.expect(stock_parser)
+    @stream_ns.doc('stream_stock', security='Bearer')
+    def get(self):
+        """Stream product and per-location quantity changes as Server-Sent Events"""
+        args = stock_parser.parse_args()
+        last_id = request.headers.get('Last-Event-ID') or args['last_event_id']
+        if last_id is not None:
+            try:
+                last_id = int(last_id)
+            except ValueError:
+                return {'message': 'Invalid last event ID'}, 400
+
+        filters = {key: args[key] for key in ('category_id', 'supplier_id', 'product_id', 'location_id')
+                   if args[key] is not None}
+        broadcaster = get_broadcaster()
+        keepalive = current_app.config['STREAM_KEEPALIVE']
+
+        def matches(item):
+            return all(item.get(key) == value for key, value in filters.items())
+
+        def generate():
+            # Subscribe before replaying so nothing is lost in between
+            subscription = broadcaster.subscribe()
+            replayed_ids = set()
+            try:
+                if last_id is not None:
+                    replayed = broadcaster.replay(last_id)
+                    if replayed is None:
+                        # Too far behind, the client should reload current stock
+                        yield b'event: reset\ndata: {}\n\n'
+                        replayed = []
+                    for item in replayed:
+                        replayed_ids.add(item['id'])
+                        if matches(item):
+                            yield format_event(item)
+
+                while not subscription.overflowed:
+                    item = subscription.get(keepalive)
+                    if item is None:
+                        yield b': keepalive\n\n'
+                    elif item['id'] not in replayed_ids and matches(item):
+                        yield format_event(item)
+            finally:
+                subscription.close()
+
+        return open_stream(generate)
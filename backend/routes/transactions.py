@@ -2,24 +2,41 @@ from flask import request
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from backend.app import db
-from backend.models import Transaction, Product
+from backend.throttle import coalesce
+from backend.models import Transaction, TransactionArchive, Location
+from backend.ledger import parse_date_range, filter_date_range
+from backend.stock import adjust_stock, lock_product, transfer_stock
 
 transactions_ns = Namespace('transactions', description='Transaction management operations')
 
 transaction_model = transactions_ns.model('Transaction', {
     'product_id': fields.Integer(required=True, description='Product ID'),
-    'action_type': fields.String(required=True, description='Action type (add, remove, update)'),
+    'action_type': fields.String(required=True, description='Action type (add, remove, transfer)'),
     'quantity': fields.Integer(required=True, description='Quantity'),
+    'location_id': fields.Integer(description='Location to add to or remove from, source of a transfer (omit for unallocated stock)'),
+    'to_location_id': fields.Integer(description='Transfer destination'),
     'notes': fields.String(description='Transaction notes')
 })
 
+date_range_parser = transactions_ns.parser()
+date_range_parser.add_argument('start', type=str, location='args', help='ISO date, inclusive')
+date_range_parser.add_argument('end', type=str, location='args', help='ISO date, exclusive')
+
 @transactions_ns.route('/')
 class TransactionList(Resource):
     @jwt_required()
+    @coalesce
+    @transactions_ns.expect(date_range_parser)
     @transactions_ns.doc('list_transactions', security='Bearer')
     def get(self):
-        """List all transactions"""
-        transactions = Transaction.query.order_by(Transaction.timestamp.desc()).all()
+        """List all transactions, optionally within a date range"""
+        try:
+            start, end = parse_date_range(request.args)
+        except ValueError:
+            return {'message': 'Invalid date range'}, 400
+        
+        query = filter_date_range(Transaction.query, Transaction, start, end)
+        transactions = query.order_by(Transaction.timestamp.desc()).all()
         return [transaction.to_dict() for transaction in transactions], 200
     
     @jwt_required()
@@ -30,26 +47,43 @@ class TransactionList(Resource):
         data = request.get_json()
         current_user_id = get_jwt_identity()
         
-        product = Product.query.get(data['product_id'])
-        if not product:
-            return {'message': 'Product not found'}, 404
-        
         action_type = data['action_type']
         quantity = data['quantity']
+        location_id = data.get('location_id')
+        to_location_id = data.get('to_location_id') if action_type == 'transfer' else None
+        
+        if action_type == 'transfer' and to_location_id is None:
+            return {'message': 'Transfers require to_location_id'}, 400
+        for id in (location_id, to_location_id):
+            if id is not None and not Location.query.get(id):
+                return {'message': 'Location not found'}, 404
+        
+        # Locked until commit so concurrent changes to this product's stock are serialized
+        product = lock_product(data['product_id'])
+        if not product:
+            return {'message': 'Product not found'}, 404
         
-        # Update product quantity based on action type
-        if action_type == 'add':
-            product.quantity += quantity
-        elif action_type == 'remove':
-            if product.quantity < quantity:
-                return {'message': 'Insufficient stock'}, 400
-            product.quantity -= quantity
+        # Update location and total quantities based on action type
+        try:
+            if action_type == 'add':
+                adjust_stock(product, location_id, quantity)
+            elif action_type == 'remove':
+                if product.quantity < quantity:
+                    raise ValueError('Insufficient stock')
+                adjust_stock(product, location_id, -quantity)
+            elif action_type == 'transfer':
+                transfer_stock(product, location_id, to_location_id, quantity)
+        except ValueError as error:
+            db.session.rollback()
+            return {'message': str(error)}, 400
         
         transaction = Transaction(
             product_id=data['product_id'],
             user_id=current_user_id,
             action_type=action_type,
             quantity=quantity,
+            location_id=location_id,
+            to_location_id=to_location_id,
             notes=data.get('notes', '')
         )
         
@@ -72,8 +106,41 @@ class TransactionDetail(Resource):
 @transactions_ns.route('/product/<int:product_id>')
 class ProductTransactions(Resource):
     @jwt_required()
+    @coalesce
+    @transactions_ns.expect(date_range_parser)
     @transactions_ns.doc('get_product_transactions', security='Bearer')
     def get(self, product_id):
         """Get all transactions for a specific product"""
-        transactions = Transaction.query.filter_by(product_id=product_id).order_by(Transaction.timestamp.desc()).all()
+        try:
+            start, end = parse_date_range(request.args)
+        except ValueError:
+            return {'message': 'Invalid date range'}, 400
+        
+        query = filter_date_range(Transaction.query.filter_by(product_id=product_id), Transaction, start, end)
+        transactions = query.order_by(Transaction.timestamp.desc()).all()
+        return [transaction.to_dict() for transaction in transactions], 200
+
+@transactions_ns.route('/archive')
+class ArchivedTransactions(Resource):
+    @jwt_required()
+    @transactions_ns.expect(date_range_parser)
+    @transactions_ns.doc('list_archived_transactions', security='Bearer',
+                         params={'product_id': 'Filter by product ID'})
+    def get(self):
+        """List archived transactions within a date range"""
+        try:
+            start, end = parse_date_range(request.args)
+        except ValueError:
+            return {'message': 'Invalid date range'}, 400
+        
+        # Require a range so only the relevant archive partitions are scanned
+        if start is None or end is None:
+            return {'message': 'start and end are required'}, 400
+        
+        query = filter_date_range(TransactionArchive.query, TransactionArchive, start, end)
+        product_id = request.args.get('product_id', type=int)
+        if product_id is not None:
+            query = query.filter_by(product_id=product_id)
+        
+        transactions = query.order_by(TransactionArchive.timestamp.desc()).all()
         return [transaction.to_dict() for transaction in transactions], 200
@@ -0,0 +1,151 @@
+"""
+Multi-location stock.
+
+Stock is held per (product, location) in `stock_levels`. `Product.quantity`
+remains the product's total over all locations and is updated in the same
+transaction as every location change, so product listings never have to sum
+location rows. Stock that predates locations, or is added without one, is
+unallocated: the part of the total not held at any location. A `transfer`
+from no location assigns unallocated stock to a location.
+
+Every change locks the product row first and only then its stock rows, so
+concurrent adjustments and transfers of one product are serialized and a
+transfer either moves the full quantity or nothing.
+"""
+from sqlalchemy import case, func
+from backend.app import db
+from backend.models import Location, Product, StockLevel
+
+
+def lock_product(product_id):
+    """Load a product with a row lock held until the transaction ends"""
+    return Product.query.filter_by(id=product_id).with_for_update().first()
+
+
+def allocated_quantity(product_id):
+    """Units of the product held at locations (uses the stock_levels primary key)"""
+    return db.session.query(func.coalesce(func.sum(StockLevel.quantity), 0)).filter(
+        StockLevel.product_id == product_id
+    ).scalar()
+
+
+def allocated_by_product():
+    """Units held at locations for every product with location stock"""
+    rows = db.session.query(StockLevel.product_id, func.sum(StockLevel.quantity)).group_by(StockLevel.product_id)
+    return dict(rows.all())
+
+
+def unallocated_quantity(product):
+    if product.id is None:
+        return product.quantity or 0
+    return (product.quantity or 0) - allocated_quantity(product.id)
+
+
+def change_level(product, location_id, delta):
+    """Apply `delta` to the product's stock at a location, raises ValueError on insufficient stock"""
+    level = StockLevel.query.filter_by(product_id=product.id, location_id=location_id).with_for_update().first()
+    if level is None:
+        level = StockLevel(product_id=product.id, location_id=location_id, quantity=0)
+        db.session.add(level)
+    if level.quantity + delta < 0:
+        raise ValueError('Insufficient stock at location')
+    level.quantity += delta
+    return level
+
+
+def adjust_stock(product, location_id, delta):
+    """Add (or with a negative delta remove) stock at a location, or unallocated stock
+    when `location_id` is None, keeping the product total in step"""
+    if location_id is None:
+        if delta < 0 and unallocated_quantity(product) < -delta:
+            raise ValueError('Insufficient unallocated stock')
+    else:
+        change_level(product, location_id, delta)
+    product.quantity += delta
+
+
+def transfer_stock(product, from_location_id, to_location_id, quantity):
+    """Move stock between locations, the product total is unchanged"""
+    if quantity <= 0:
+        raise ValueError('Transfer quantity must be positive')
+    if from_location_id == to_location_id:
+        raise ValueError('Source and destination locations must differ')
+
+    if from_location_id is None:
+        if unallocated_quantity(product) < quantity:
+            raise ValueError('Insufficient unallocated stock')
+        change_level(product, to_location_id, quantity)
+        return
+
+    # Stock rows are always locked in location order. On failure the caller rolls back.
+    for location_id, delta in sorted(((from_location_id, -quantity), (to_location_id, quantity))):
+        change_level(product, location_id, delta)
+
+
+def set_total(product, quantity):
+    """Set the total directly (product edits), the difference is unallocated stock"""
+    allocated = allocated_quantity(product.id) if product.id is not None else 0
+    if quantity < allocated:
+        raise ValueError(f'Quantity cannot be below the {allocated} units held at locations')
+    product.quantity = quantity
+
+
+def product_availability(product):
+    """Total and per-location availability of one product"""
+    rows = db.session.query(StockLevel.location_id, Location.code, Location.name, StockLevel.quantity).join(
+        Location, Location.id == StockLevel.location_id
+    ).filter(StockLevel.product_id == product.id).order_by(Location.name).all()
+
+    allocated = sum(row.quantity for row in rows)
+    return {
+        'product_id': product.id,
+        'sku': product.sku,
+        'quantity': product.quantity,
+        'allocated': allocated,
+        'unallocated': product.quantity - allocated,
+        'locations': [
+            {'location_id': row.location_id, 'code': row.code, 'name': row.name, 'quantity': row.quantity}
+            for row in rows
+        ]
+    }
+
+
+def location_stock(location_id):
+    """Products with stock at a location, answered from the location rollup index"""
+    rows = db.session.query(
+        StockLevel.product_id, Product.sku, Product.name, StockLevel.quantity, Product.quantity.label('total')
+    ).join(Product, Product.id == StockLevel.product_id).filter(
+        StockLevel.location_id == location_id, StockLevel.quantity > 0
+    ).order_by(Product.sku).all()
+    return [
+        {'product_id': row.product_id, 'sku': row.sku, 'name': row.name,
+         'quantity': row.quantity, 'total_quantity': row.total}
+        for row in rows
+    ]
+
+
+def location_summary():
+    """Units and stocked products per location, plus catalog totals"""
+    rollup = db.session.query(
+        StockLevel.location_id,
+        func.sum(case((StockLevel.quantity > 0, 1), else_=0)).label('product_count'),
+        func.coalesce(func.sum(StockLevel.quantity), 0).label('quantity')
+    ).group_by(StockLevel.location_id).subquery()
+
+    rows = db.session.query(
+        Location.id, Location.code, Location.name,
+        func.coalesce(rollup.c.product_count, 0), func.coalesce(rollup.c.quantity, 0)
+    ).outerjoin(rollup, rollup.c.location_id == Location.id).order_by(Location.name).all()
+
+    locations = [
+        {'location_id': id, 'code': code, 'name': name, 'product_count': product_count, 'quantity': quantity}
+        for id, code, name, product_count, quantity in rows
+    ]
+    total = db.session.query(func.coalesce(func.sum(Product.quantity), 0)).scalar()
+    allocated = sum(location['quantity'] for location in locations)
+    return {
+        'quantity': total,
+        'allocated': allocated,
+        'unallocated': total - allocated,
+        'locations': locations
+    }
@@ -0,0 +1,57 @@
+import pytest
+from backend.app import create_app, db
+from backend.models import Category, Location, Product, Supplier, User
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path / "test.db"}')
+    monkeypatch.setenv('RATELIMIT_ENABLED', 'false')
+    monkeypatch.setenv('JOBS_RESULT_DIR', str(tmp_path / 'job-results'))
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    user = User(username='admin', email='admin@inventory.com', role='admin')
+    user.set_password('admin123')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_headers(client, user):
+    response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'})
+    return {'Authorization': 'Bearer ' + response.get_json()['access_token']}
+
+
+@pytest.fixture
+def product(app):
+    category = Category(name='Electronics')
+    supplier = Supplier(name='Acme')
+    db.session.add_all([category, supplier])
+    db.session.flush()
+    product = Product(name='Laptop', sku='LAP-001', quantity=0, price=999.0, low_stock_threshold=10,
+                      category=category, supplier=supplier)
+    db.session.add(product)
+    db.session.commit()
+    return product
+
+
+@pytest.fixture
+def locations(app):
+    locations = [Location(name='Warehouse A', code='WH-A'), Location(name='Warehouse B', code='WH-B')]
+    db.session.add_all(locations)
+    db.session.commit()
+    return locations
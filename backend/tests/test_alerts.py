@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import select, update
+from backend.app import db
+from backend.alerts import alerts_after, crossing, record_bulk_crossings
+from backend.models import Product, StockAlert
+
+
+@pytest.fixture
+def stocked(product):
+    # Threshold 10 with the default 20% hysteresis: low below 10, recovered from 12
+    product.quantity = 20
+    db.session.commit()
+    StockAlert.query.delete()
+    product.low_stock_alerted = False
+    db.session.commit()
+    return product
+
+
+def set_quantity(product, quantity):
+    product.quantity = quantity
+    db.session.commit()
+
+
+def alert_kinds():
+    return [alert.kind for alert in StockAlert.query.order_by(StockAlert.sequence)]
+
+
+def test_crossing_uses_hysteresis(app):
+    assert crossing(9, 10, False) == 'low'
+    assert crossing(10, 10, False) is None
+    assert crossing(9, 10, True) is None
+    assert crossing(11, 10, True) is None
+    assert crossing(12, 10, True) == 'recovered'
+    # The margin is at least one unit
+    assert crossing(0, 1, False) == 'low'
+    assert crossing(1, 1, True) is None
+    assert crossing(2, 1, True) == 'recovered'
+
+
+def test_one_alert_per_crossing(stocked):
+    for quantity in [15, 9, 8, 10, 9, 11, 12, 13, 11, 9, 5, 12]:
+        set_quantity(stocked, quantity)
+
+    assert alert_kinds() == ['low', 'recovered', 'low', 'recovered']
+
+
+def test_threshold_change_can_cross(stocked):
+    stocked.low_stock_threshold = 25
+    db.session.commit()
+    stocked.low_stock_threshold = 16
+    db.session.commit()
+
+    assert alert_kinds() == ['low', 'recovered']
+
+
+def test_bulk_crossings_share_the_alert_state(stocked):
+    set_quantity(stocked, 9)
+    rows = db.session.execute(
+        select(Product.id, Product.quantity, Product.low_stock_threshold, Product.low_stock_alerted)
+    ).all()
+    db.session.execute(update(Product), [{'id': stocked.id, 'low_stock_threshold': 5}])
+    # Already alerted, a lower threshold it is above by the margin recovers it once
+    assert record_bulk_crossings([(row.id, row.quantity, 5, row.low_stock_alerted) for row in rows]) == 1
+    db.session.commit()
+    db.session.expire_all()
+
+    assert alert_kinds() == ['low', 'recovered']
+    assert db.session.get(Product, stocked.id).low_stock_alerted is False
+
+
+def test_alerts_are_numbered_in_commit_order(stocked):
+    set_quantity(stocked, 9)
+    set_quantity(stocked, 12)
+
+    alerts = alerts_after(0)
+    assert [alert.sequence for alert in alerts] == [alerts[0].sequence, alerts[0].sequence + 1]
+    assert [alert.kind for alert in alerts_after(alerts[0].sequence)] == ['recovered']
@@ -0,0 +1,85 @@
+import math
+from statistics import NormalDist
+import numpy as np
+import pytest
+from backend.benchmarks.forecasting import make_demand, python_loop
+from backend.forecasting import DEFAULTS, forecast_demand, forecast_params
+
+
+def reference_reorder_points(products, product_index, day_index, quantity, params):
+    """Per-product loop over dense daily series, for every forecast method"""
+    window = params['window_days']
+    series = [[0] * window for _ in range(products)]
+    for product, day, amount in zip(product_index.tolist(), day_index.tolist(), quantity.tolist()):
+        series[product][day] += amount
+
+    z = NormalDist().inv_cdf(params['service_level'])
+    lead_time = params['lead_time_days']
+    alpha = params['alpha']
+    reorder_points = []
+    for values in series:
+        mean = sum(values) / window
+        std = math.sqrt(max(sum(v * v for v in values) / window - mean * mean, 0.0))
+        if params['method'] == 'ewma':
+            smoothed = 0.0
+            for value in values:
+                smoothed = alpha * value + (1 - alpha) * smoothed
+            forecast = smoothed / (1 - (1 - alpha) ** window)
+        elif params['method'] == 'moving_average':
+            forecast = sum(values[-params['ma_days']:]) / params['ma_days']
+        else:
+            forecast = mean
+        reorder_points.append(math.ceil(forecast * lead_time + z * std * math.sqrt(lead_time) - 1e-9))
+    return reorder_points
+
+
+@pytest.mark.parametrize('method', ['ewma', 'moving_average', 'mean'])
+def test_vectorized_forecast_matches_per_product_loop(method):
+    products = 300
+    params = dict(DEFAULTS, window_days=60, ma_days=14, method=method)
+    demand = make_demand(products, params['window_days'], density=0.1)
+
+    result = forecast_demand(products, *demand, **params)
+
+    assert result['reorder_point'].tolist() == reference_reorder_points(products, *demand, params)
+    assert np.array_equal(result['has_demand'], np.bincount(demand[0], minlength=products) > 0)
+
+
+def test_benchmark_loop_agrees():
+    products = 200
+    params = dict(DEFAULTS, window_days=90)
+    demand = make_demand(products, params['window_days'], density=0.05, seed=1)
+
+    result = forecast_demand(products, *demand, **params)
+
+    assert result['reorder_point'].tolist() == python_loop(products, *demand, params)
+
+
+def test_products_without_demand_get_zero():
+    result = forecast_demand(3, np.array([1]), np.array([5]), np.array([4]), **DEFAULTS)
+
+    assert result['reorder_point'].tolist()[0::2] == [0, 0]
+    assert result['has_demand'].tolist() == [False, True, False]
+
+
+@pytest.mark.parametrize('values', [
+    {'lead_time_days': 'inf'},
+    {'lead_time_days': 'nan'},
+    {'lead_time_days': -1},
+    {'lead_time_days': 1000},
+    {'alpha': float('nan')},
+    {'window_days': 0},
+    {'window_days': 5000},
+    {'window_days': 10, 'ma_days': 20},
+    {'service_level': 1},
+    {'method': 'median'},
+])
+def test_forecast_params_rejects_invalid_values(values):
+    with pytest.raises(ValueError):
+        forecast_params(values)
+
+
+def test_forecast_params_fills_defaults():
+    params = forecast_params({'window_days': '30', 'lead_time_days': '3.5'})
+
+    assert params == dict(DEFAULTS, window_days=30, lead_time_days=3.5)
@@ -0,0 +1,112 @@
+import pytest
+from backend.app import db
+from backend.models import Product, StockLevel
+from backend.stock import adjust_stock, product_availability, transfer_stock
+
+
+def post_transaction(client, headers, product, action_type, quantity, location=None, to_location=None):
+    return client.post('/api/transactions/', headers=headers, json={
+        'product_id': product.id,
+        'action_type': action_type,
+        'quantity': quantity,
+        'location_id': location.id if location else None,
+        'to_location_id': to_location.id if to_location else None
+    })
+
+
+def levels(product):
+    db.session.expire_all()
+    return {level.location_id: level.quantity
+            for level in StockLevel.query.filter_by(product_id=product.id)}
+
+
+def assert_balanced(product):
+    availability = product_availability(db.session.get(Product, product.id))
+    assert availability['quantity'] == availability['allocated'] + availability['unallocated']
+    assert availability['allocated'] == sum(location['quantity'] for location in availability['locations'])
+    assert availability['unallocated'] >= 0
+    return availability
+
+
+def test_transfer_moves_the_full_quantity(client, auth_headers, product, locations):
+    a, b = locations
+    post_transaction(client, auth_headers, product, 'add', 6, a)
+
+    response = post_transaction(client, auth_headers, product, 'transfer', 4, a, b)
+
+    assert response.status_code == 201
+    assert levels(product) == {a.id: 2, b.id: 4}
+    assert assert_balanced(product)['quantity'] == 6
+
+
+@pytest.mark.parametrize('reverse', [False, True])
+def test_failed_transfer_moves_nothing(client, auth_headers, product, locations, reverse):
+    # Levels are changed in location order, so in one direction the destination
+    # is credited before the source is found short
+    source, destination = reversed(locations) if reverse else locations
+    post_transaction(client, auth_headers, product, 'add', 6, source)
+
+    response = post_transaction(client, auth_headers, product, 'transfer', 8, source, destination)
+
+    assert response.status_code == 400
+    assert levels(product).get(source.id) == 6
+    assert levels(product).get(destination.id, 0) == 0
+    assert assert_balanced(product)['quantity'] == 6
+
+
+def test_transfer_from_unallocated_stock(client, auth_headers, product, locations):
+    a, _ = locations
+    post_transaction(client, auth_headers, product, 'add', 5)
+
+    assert post_transaction(client, auth_headers, product, 'transfer', 6, None, a).status_code == 400
+    assert post_transaction(client, auth_headers, product, 'transfer', 3, None, a).status_code == 201
+
+    availability = assert_balanced(product)
+    assert (availability['quantity'], availability['allocated'], availability['unallocated']) == (5, 3, 2)
+
+
+def test_total_stays_allocated_plus_unallocated(client, auth_headers, product, locations):
+    a, b = locations
+    steps = [
+        ('add', 10, a, None, 201),
+        ('add', 4, None, None, 201),
+        ('transfer', 3, a, b, 201),
+        ('remove', 2, b, None, 201),
+        ('transfer', 4, None, b, 201),
+        ('remove', 1, None, None, 400),  # all stock is allocated now
+        ('remove', 8, a, None, 400),
+        ('remove', 7, a, None, 201),
+    ]
+    for action_type, quantity, location, to_location, status in steps:
+        response = post_transaction(client, auth_headers, product, action_type, quantity, location, to_location)
+        assert response.status_code == status, (action_type, quantity, response.get_json())
+        assert_balanced(product)
+
+    assert levels(product) == {a.id: 0, b.id: 5}
+    assert db.session.get(Product, product.id).quantity == 5
+
+
+def test_product_edit_cannot_drop_below_allocated(client, auth_headers, product, locations):
+    a, _ = locations
+    post_transaction(client, auth_headers, product, 'add', 5, a)
+
+    response = client.put(f'/api/products/{product.id}', headers=auth_headers, json={'quantity': 4})
+
+    assert response.status_code == 400
+    assert assert_balanced(product)['quantity'] == 5
+
+
+def test_stock_helpers_reject_invalid_changes(product, locations):
+    a, b = locations
+    adjust_stock(product, a.id, 3)
+    db.session.commit()
+
+    with pytest.raises(ValueError):
+        adjust_stock(product, None, -1)
+    with pytest.raises(ValueError):
+        transfer_stock(product, a.id, a.id, 1)
+    with pytest.raises(ValueError):
+        transfer_stock(product, a.id, b.id, 0)
+    db.session.rollback()
+
+    assert levels(product) == {a.id: 3}
@@ -0,0 +1,210 @@
+"""
+Request coalescing, rate limiting and stream slots.
+
+`coalesce` makes concurrent identical GET requests in a worker share one
+computation: the first request runs the handler, the others wait for its
+result. Only use it on endpoints whose response does not depend on the
+caller.
+
+The rate limiter is a token bucket per JWT identity (or client address for
+anonymous requests), applied to every /api/ request. Buckets live in
+process memory by default; RATELIMIT_STORAGE=database keeps them in the
+`rate_limits` table so all workers share one budget.
+
+Server-Sent Event streams hold a worker thread for as long as they are
+open. `open_stream` caps them at STREAM_MAX_CONNECTIONS per process and
+answers 503 beyond that, so streams never take every thread and regular
+API requests keep being served. Run a separate gunicorn service with more
+threads for streams when many clients need them (see docker-compose.yml).
+"""
+import math
+import threading
+import time
+from functools import wraps
+from flask import Response, current_app, request, stream_with_context
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from sqlalchemy.exc import IntegrityError
+from backend.app import db
+from backend.models import RateLimit
+from backend.representations import dumps
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, func):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result
+
+
+single_flight = SingleFlight()
+
+
+def coalesce(func):
+    """Share one in-flight computation between concurrent identical requests"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (func.__qualname__, request.full_path)
+        return single_flight.do(key, lambda: func(*args, **kwargs))
+    return wrapper
+
+
+class MemoryStore:
+    """Token buckets in process memory"""
+
+    max_keys = 10000
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def consume(self, key, rate, burst, now):
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.max_keys:
+                self.prune(rate, burst, now)
+        return allowed, tokens
+
+    def prune(self, rate, burst, now):
+        # Buckets that have refilled completely carry no state
+        idle = burst / rate
+        self.buckets = {key: value for key, value in self.buckets.items() if now - value[1] < idle}
+
+
+class DatabaseStore:
+    """Token buckets in the `rate_limits` table, shared by all workers"""
+
+    def consume(self, key, rate, burst, now):
+        table = RateLimit.__table__
+        # A separate connection keeps the bucket update out of the request's transaction
+        with db.engine.begin() as connection:
+            row = connection.execute(
+                db.select(table.c.tokens, table.c.updated_at).where(table.c.key == key).with_for_update()
+            ).first()
+            if row is None:
+                try:
+                    connection.execute(table.insert().values(key=key, tokens=burst - 1, updated_at=now))
+                except IntegrityError:
+                    # Another worker created the bucket first, count this request as allowed
+                    pass
+                return True, burst - 1
+
+            tokens = min(burst, row.tokens + (now - row.updated_at) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            connection.execute(table.update().where(table.c.key == key).values(tokens=tokens, updated_at=now))
+        return allowed, tokens
+
+
+# Stream endpoints also accept `?jwt=<token>` because EventSource cannot send headers
+STREAM_TOKEN_LOCATIONS = ['headers', 'query_string']
+
+
+def rate_limit_key():
+    try:
+        verify_jwt_in_request(optional=True, locations=STREAM_TOKEN_LOCATIONS)
+        identity = get_jwt_identity()
+    except Exception:
+        # Invalid tokens are rejected by the endpoint itself
+        identity = None
+    if identity is not None:
+        return f'user:{identity}'
+    # The client address as forwarded by TRUSTED_PROXY_HOPS proxies (ProxyFix in create_app)
+    return f'ip:{request.remote_addr}'
+
+
+def init_rate_limiter(app):
+    if not app.config['RATELIMIT_ENABLED']:
+        return
+    store = DatabaseStore() if app.config['RATELIMIT_STORAGE'] == 'database' else MemoryStore()
+    app.extensions['rate_limit_store'] = store
+
+    @app.before_request
+    def check_rate_limit():
+        if not request.path.startswith('/api/') or request.method == 'OPTIONS':
+            return None
+
+        rate = current_app.config['RATELIMIT_RATE']
+        burst = current_app.config['RATELIMIT_BURST']
+        allowed, tokens = store.consume(rate_limit_key(), rate, burst, time.time())
+        if allowed:
+            return None
+
+        retry_after = max(1, math.ceil((1 - tokens) / rate))
+        return Response(dumps({'message': 'Rate limit exceeded'}), status=429,
+                        mimetype='application/json', headers={'Retry-After': str(retry_after)})
+
+
+class StreamSlots:
+    """Counts open streams in this process"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.active = 0
+
+    def acquire(self):
+        with self.lock:
+            if self.active >= self.limit:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.active -= 1
+
+
+def init_stream_slots(app):
+    app.extensions['stream_slots'] = StreamSlots(app.config['STREAM_MAX_CONNECTIONS'])
+
+
+def open_stream(generate):
+    """Serve an SSE generator if a stream slot is free, else a 503 response"""
+    slots = current_app.extensions['stream_slots']
+    if not slots.acquire():
+        return Response(dumps({'message': 'Too many open streams, retry later'}), status=503,
+                        mimetype='application/json', headers={'Retry-After': '5'})
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs when the stream ends or the server notices the client has gone
+    response.call_on_close(slots.release)
+    return response
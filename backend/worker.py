@@ -0,0 +1,137 @@
+"""
+Background job worker.
+
+Polls the `jobs` table and runs queued jobs in a process pool, so heavy
+imports, exports and reports never block the gunicorn request workers.
+The worker heartbeats every job it is running, so only jobs of a worker
+that died are requeued after JOB_STALE_AFTER. If a pool process crashes,
+its jobs are marked failed and the pool is recreated.
+When ALERT_WEBHOOK_URL is set it also delivers the low stock alert outbox.
+Run next to the API with the same DATABASE_URL:
+
+    python -m backend.worker --processes 2
+"""
+import argparse
+import logging
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+from backend.app import create_app, db
+
+_app = None
+
+
+def _init_process():
+    """Give each pool process its own app and database connections"""
+    global _app
+    # Forked processes inherit the worker's SIGTERM handler, restore the default
+    # so the pool can stop them
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    _app = create_app()
+
+
+def _execute(job_id):
+    from backend.jobs import run_job
+    with _app.app_context():
+        run_job(job_id)
+
+
+def deliver_alerts(url):
+    """Flush the low stock alert outbox to the webhook, failures are retried next poll"""
+    from backend.alerts import deliver_pending_alerts
+    try:
+        while deliver_pending_alerts(url):
+            pass
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('Alert webhook delivery failed')
+
+
+def run_worker(app, processes, poll_interval):
+    from backend.jobs import claim_job, fail_jobs, heartbeat_jobs, requeue_stale_jobs, worker_id
+
+    name = worker_id()
+    stale_after = app.config['JOB_STALE_AFTER']
+    heartbeat_interval = max(poll_interval, stale_after / 4)
+    webhook_url = app.config['ALERT_WEBHOOK_URL']
+    running = {}  # future -> job id
+    last_heartbeat = time.monotonic()
+    stopping = threading.Event()
+    # Finish running jobs and exit cleanly on SIGTERM (docker stop, systemd)
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+    app.logger.info('Job worker %s started with %d processes', name, processes)
+
+    pool = ProcessPoolExecutor(max_workers=processes, initializer=_init_process)
+    try:
+        # After SIGTERM no new jobs are claimed, running ones keep their heartbeat until done
+        while not stopping.is_set() or running:
+            broken = False
+            lost = []
+            for future in [future for future in running if future.done()]:
+                job_id = running.pop(future)
+                if future.exception() is not None:
+                    broken = broken or isinstance(future.exception(), BrokenProcessPool)
+                    lost.append(job_id)
+            claimed = False
+
+            with app.app_context():
+                if lost:
+                    fail_jobs(lost, 'Worker process exited unexpectedly')
+                    app.logger.error('Jobs %s lost with their worker process', lost)
+                if time.monotonic() - last_heartbeat >= heartbeat_interval:
+                    try:
+                        heartbeat_jobs(list(running.values()), name)
+                        last_heartbeat = time.monotonic()
+                    except OperationalError:
+                        # SQLite: a job may hold the write lock, retry on the next poll
+                        db.session.rollback()
+                requeue_stale_jobs(stale_after)
+                if webhook_url:
+                    deliver_alerts(webhook_url)
+                while not broken and not stopping.is_set() and len(running) < processes:
+                    job_id = claim_job(name)
+                    if job_id is None:
+                        break
+                    app.logger.info('Running job %s', job_id)
+                    try:
+                        running[pool.submit(_execute, job_id)] = job_id
+                    except BrokenProcessPool:
+                        fail_jobs([job_id], 'Worker process exited unexpectedly')
+                        broken = True
+                    claimed = True
+
+            if broken:
+                # A crashed process breaks the whole pool and the pool terminates the
+                # surviving processes, their jobs roll back and are marked failed too
+                app.logger.error('Job worker pool broke, starting a new one')
+                pool.shutdown(wait=True, cancel_futures=True)
+                with app.app_context():
+                    fail_jobs(list(running.values()), 'Worker process exited unexpectedly')
+                running.clear()
+                pool = ProcessPoolExecutor(max_workers=processes, initializer=_init_process)
+            elif stopping.is_set():
+                wait(list(running), timeout=poll_interval)
+            elif not claimed:
+                stopping.wait(poll_interval)
+
+        app.logger.info('Job worker %s stopped', name)
+    finally:
+        pool.shutdown(wait=True)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    app = create_app()
+    parser = argparse.ArgumentParser(description='Run the background job worker.')
+    parser.add_argument('--processes', type=int, default=app.config['JOB_WORKER_PROCESSES'])
+    parser.add_argument('--poll-interval', type=float, default=app.config['JOB_POLL_INTERVAL'])
+    args = parser.parse_args()
+    run_worker(app, args.processes, args.poll_interval)
+
+
+if __name__ == '__main__':
+    main()
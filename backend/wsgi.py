@@ -0,0 +1,11 @@
+"""
+WSGI entry point.
+
+Creating the app at import time lets `gunicorn --preload` build it once in
+the master process and share it with every forked worker:
+
+    gunicorn -c backend/gunicorn.conf.py backend.wsgi:app
+"""
+from backend.app import create_app
+
+app = create_app()